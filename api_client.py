@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# api_client.py - Health-aware HTTP client for the ATLAS API with per-endpoint circuit breakers
+
+import os
+import threading
+import time
+import requests
+import tracing
+
+API_URL = os.getenv("ATLAS_API_URL", "http://localhost:3000")
+
+# ────────────────────────────────────────────────
+# CONFIG
+# ────────────────────────────────────────────────
+
+FAILURE_THRESHOLD = 3        # consecutive failures before an endpoint is opened
+RESET_TIMEOUT = 30.0         # seconds an open circuit waits before a trial request
+HEALTH_INTERVAL = 5.0        # seconds between background /health probes
+HEALTH_TIMEOUT = 1.0         # /health must answer faster than this to count as up
+
+# Seconds a call may take before it counts as a failure even if it succeeds.
+# /health only reflects the Node server, not Groq behind it, so a slow Groq
+# is only noticed here. Once an endpoint has failed, its requests are also
+# cut off at the budget instead of the caller's (much longer) timeout.
+LATENCY_BUDGETS = {
+    "/api/transcribe-groq": 4.0,
+    "/api/ask": 10.0,
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of making a request to an endpoint that is known to be down"""
+
+
+class CircuitBreaker:
+    """Tracks failures for one endpoint.
+
+    closed    → requests flow; FAILURE_THRESHOLD consecutive failures open it
+    open      → requests fail immediately until RESET_TIMEOUT has passed
+    half-open → a single trial request decides between closed and open
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a request may be sent now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"🟢 [API] {self.name} recovered")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    @property
+    def degraded(self):
+        """True after a recent failure, until a request succeeds again"""
+        return self.state != CLOSED or self.failures > 0
+
+    def record_failure(self, reason="error"):
+        tracing.inc("api_failures", endpoint=self.name, reason=reason)
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def trip(self):
+        """Open the circuit immediately (e.g. the server failed its health check)"""
+        with self._lock:
+            self._open()
+
+    def allow_trial(self):
+        """Let the next request through as a half-open trial (server came back)"""
+        with self._lock:
+            if self.state == OPEN:
+                self.opened_at = 0.0
+
+    def _open(self):
+        if self.state != OPEN:
+            tracing.inc("circuit_opened", endpoint=self.name)
+            print(f"🔴 [API] {self.name} unavailable, using local fallback")
+        self.state = OPEN
+        self.opened_at = time.time()
+        self._trial_in_flight = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(endpoint):
+    """The circuit breaker for an endpoint path such as '/api/ask'"""
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+def is_available(endpoint):
+    """True unless the endpoint's circuit is open (does not consume a trial request)"""
+    b = breaker(endpoint)
+    if b.state == CLOSED:
+        return True
+    return b.state == OPEN and time.time() - b.opened_at >= b.reset_timeout
+
+
+def post(endpoint, json=None, timeout=10):
+    """requests.post through the endpoint's circuit breaker.
+
+    Raises CircuitOpenError without touching the network when the endpoint is
+    open, so callers can fail over to a local path straight away. A response
+    slower than the endpoint's LATENCY_BUDGETS entry is returned but counts
+    as a failure; while the endpoint is degraded the timeout is capped at it.
+    """
+    b = breaker(endpoint)
+    if not b.allow():
+        raise CircuitOpenError(f"{endpoint} circuit open")
+
+    budget = LATENCY_BUDGETS.get(endpoint)
+    if budget and b.degraded:
+        timeout = min(timeout, budget)
+
+    start = time.perf_counter()
+    try:
+        r = requests.post(f"{API_URL}{endpoint}", json=json, timeout=timeout)
+    except requests.exceptions.Timeout:
+        b.record_failure("timeout")
+        raise
+    except requests.exceptions.RequestException:
+        b.record_failure()
+        raise
+    elapsed = time.perf_counter() - start
+
+    # 5xx means the server or Groq behind it is failing; 4xx is our input
+    if r.status_code >= 500:
+        b.record_failure()
+    elif budget and elapsed > budget:
+        print(f"🐢 [API] {endpoint} took {elapsed:.1f} s (budget {budget:.0f} s)")
+        b.record_failure("slow")
+    else:
+        b.record_success()
+    return r
+
+
+# ────────────────────────────────────────────────
+# BACKGROUND HEALTH PROBE
+# ────────────────────────────────────────────────
+
+server_healthy = True
+_monitor_started = False
+
+
+def probe_health():
+    """Probe /health once; when the server is down every endpoint is opened"""
+    global server_healthy
+    try:
+        r = requests.get(f"{API_URL}/health", timeout=HEALTH_TIMEOUT)
+        healthy = r.ok
+    except requests.exceptions.RequestException:
+        healthy = False
+
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    for b in breakers:
+        if not healthy:
+            b.trip()
+        elif not server_healthy:
+            b.allow_trial()
+    if healthy != server_healthy:
+        print(f"{'🟢' if healthy else '🔴'} [API] Server {'reachable' if healthy else 'unreachable'} at {API_URL}")
+    server_healthy = healthy
+    return healthy
+
+
+def _health_loop(interval):
+    while True:
+        probe_health()
+        time.sleep(interval)
+
+
+def start_health_monitor(endpoints=(), interval=HEALTH_INTERVAL):
+    """Register endpoints and start probing /health in a daemon thread"""
+    global _monitor_started
+    for endpoint in endpoints:
+        breaker(endpoint)
+    if _monitor_started:
+        return
+    _monitor_started = True
+    threading.Thread(target=_health_loop, args=(interval,), daemon=True, name="atlas-health").start()
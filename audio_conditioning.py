@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# audio_conditioning.py - Trim silence, high-pass and normalize captured audio before upload
+
+import numpy as np
+
+# ────────────────────────────────────────────────
+# CONFIG
+# ────────────────────────────────────────────────
+
+FRAME_MS = 30                 # analysis frame size
+HIGHPASS_CUTOFF_HZ = 100      # removes rumble, desk thumps and DC offset
+HIGHPASS_TRANSITION_HZ = 40   # width of the smooth roll-off below the cutoff
+SPEECH_RMS_THRESHOLD = 500    # absolute energy floor for a speech frame (same scale as SILENCE_THRESHOLD)
+NOISE_FLOOR_FACTOR = 3.0      # speech must beat the noise floor by this much (capped, see _speech_mask)
+MIN_SPEECH_RUN_MS = 90        # shorter bursts (keyboard clicks, pops) are not speech
+PAD_MS = 200                  # keep a little context around the detected speech
+TARGET_PEAK = 0.89            # ~ -1 dBFS after normalization
+MAX_GAIN = 8.0                # never boost quiet rooms more than ~18 dB
+
+SAMPLE_WIDTH = 2              # paInt16
+
+
+def _highpass(samples, rate, cutoff=HIGHPASS_CUTOFF_HZ, transition=HIGHPASS_TRANSITION_HZ):
+    """Zero-phase FFT high-pass with a raised-cosine transition band"""
+    spectrum = np.fft.rfft(samples)
+    freqs = np.fft.rfftfreq(len(samples), d=1.0 / rate)
+
+    gain = np.ones_like(freqs)
+    low = max(cutoff - transition, 0.0)
+    gain[freqs <= low] = 0.0
+    band = (freqs > low) & (freqs < cutoff)
+    gain[band] = 0.5 - 0.5 * np.cos(np.pi * (freqs[band] - low) / (cutoff - low))
+
+    return np.fft.irfft(spectrum * gain, n=len(samples))
+
+
+def _frame_rms(samples, frame_len):
+    """RMS energy of each complete analysis frame"""
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def _speech_mask(rms, min_run):
+    """Mark frames as speech, dropping runs shorter than min_run frames"""
+    if len(rms) == 0:
+        return np.zeros(0, dtype=bool)
+
+    # The 20th percentile is the noise floor only when the clip has enough
+    # quiet frames; when speech fills it (barge-in, trimmed fixtures) the
+    # "floor" is speech. So the relative threshold is capped below the level
+    # that min_run frames reach, and only the absolute one can reject them.
+    noise_floor = np.percentile(rms, 20)
+    speech_level = np.sort(rms)[-min(min_run, len(rms))]
+    relative = min(noise_floor * NOISE_FLOOR_FACTOR, speech_level / NOISE_FLOOR_FACTOR)
+    threshold = max(SPEECH_RMS_THRESHOLD, relative)
+    mask = rms > threshold
+
+    # Remove short bursts (clicks, taps) that are loud but not speech
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    for start, end in zip(starts, ends):
+        if end - start < min_run:
+            mask[start:end] = False
+
+    return mask
+
+
+def condition_audio(pcm, rate):
+    """Trim leading/trailing non-speech, high-pass and normalize 16-bit mono PCM.
+
+    Returns (conditioned_pcm, stats). conditioned_pcm is None when no speech
+    frames were found, so the caller can skip the upload entirely.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float64)
+    original_bytes = len(pcm)
+    original_ms = 1000.0 * len(samples) / rate
+
+    stats = {
+        "original_bytes": original_bytes,
+        "original_ms": original_ms,
+        "bytes": 0,
+        "ms": 0.0,
+        "bytes_saved": original_bytes,
+        "ms_saved": original_ms,
+        "gain": 1.0,
+        "speech": False,
+    }
+
+    frame_len = int(rate * FRAME_MS / 1000)
+    if len(samples) < frame_len:
+        return None, stats
+
+    filtered = _highpass(samples, rate)
+    rms = _frame_rms(filtered, frame_len)
+    mask = _speech_mask(rms, max(1, int(np.ceil(MIN_SPEECH_RUN_MS / FRAME_MS))))
+
+    speech_frames = np.flatnonzero(mask)
+    if len(speech_frames) == 0:
+        return None, stats
+
+    pad = int(rate * PAD_MS / 1000)
+    start = max(0, speech_frames[0] * frame_len - pad)
+    end = min(len(filtered), (speech_frames[-1] + 1) * frame_len + pad)
+    trimmed = filtered[start:end]
+
+    peak = np.max(np.abs(trimmed))
+    gain = min(MAX_GAIN, TARGET_PEAK * 32767 / peak) if peak > 0 else 1.0
+    out = np.clip(trimmed * gain, -32768, 32767).astype(np.int16).tobytes()
+
+    out_ms = 1000.0 * len(trimmed) / rate
+    stats.update({
+        "bytes": len(out),
+        "ms": out_ms,
+        "bytes_saved": original_bytes - len(out),
+        "ms_saved": original_ms - out_ms,
+        "gain": float(gain),
+        "speech": True,
+    })
+    return out, stats
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# audio_health.py - Dropped-audio accounting and recognizer real-time-factor monitoring
+
+import threading
+import time
+import numpy as np
+import tracing
+
+# ────────────────────────────────────────────────
+# CONFIG
+# ────────────────────────────────────────────────
+
+OVERLOAD_RTF = 0.8           # recognizer using >80% of real time → shed work
+RECOVER_RTF = 0.5            # ...until it is comfortably back under this
+OVERLOAD_QUEUE_CHUNKS = 8    # or when this many chunks (~0.5 s) are waiting
+PARTIAL_EVERY = 4            # under overload, only decode partials every Nth chunk
+RTF_SMOOTHING = 0.1          # EWMA weight of the newest chunk
+WARN_INTERVAL = 10.0         # seconds between repeated warnings
+
+# ────────────────────────────────────────────────
+# CAPTURE-SIDE COUNTERS
+# ────────────────────────────────────────────────
+
+capture_stats = {
+    "overflows": 0,        # PortAudio reported input overflow (audio lost before we saw it)
+    "underflows": 0,       # PortAudio reported input underflow
+    "dropped_chunks": 0,   # chunks discarded because a consumer queue was full
+}
+_stats_lock = threading.Lock()
+
+
+def count(name, n=1):
+    """Bump a capture counter (called from the audio callback / capture thread)"""
+    with _stats_lock:
+        capture_stats[name] += n
+    tracing.inc(f"capture_{name}", n)
+
+
+def capture_summary():
+    with _stats_lock:
+        return ", ".join(f"{k}={v}" for k, v in capture_stats.items())
+
+
+def chunk_rms(data):
+    """RMS energy of one 16-bit PCM chunk (same scale as SILENCE_THRESHOLD)"""
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float64)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+class RecognizerMonitor:
+    """Tracks how fast a Vosk recognizer keeps up with the audio it is fed.
+
+    Real-time factor (RTF) = processing time / audio time per chunk, smoothed.
+    When RTF or the capture queue depth says we are falling behind, the
+    monitor enters overload mode: partial decoding is thinned out and chunks
+    below the silence threshold are not fed to the recognizer (they are still
+    recorded for upload). Warnings are printed when it can no longer keep up.
+
+    adaptive=False only measures - used for lossless replay sources, where the
+    queue is always full by design and shedding would change the results.
+    """
+
+    def __init__(self, name, chunk_seconds, silence_threshold=500, adaptive=True):
+        self.name = name
+        self.adaptive = adaptive
+        self.chunk_seconds = chunk_seconds
+        self.silence_threshold = silence_threshold
+        self.rtf = 0.0
+        self.peak_rtf = 0.0
+        self.chunks = 0
+        self.skipped = 0
+        self.overloaded = False
+        self._last_warning = 0.0
+        self._last_losses = self._losses()
+
+    @staticmethod
+    def _losses():
+        with _stats_lock:
+            return capture_stats["overflows"] + capture_stats["dropped_chunks"]
+
+    def should_skip(self, data):
+        """Under overload, skip feeding non-speech chunks to the recognizer"""
+        if self.overloaded and chunk_rms(data) < self.silence_threshold:
+            self.skipped += 1
+            tracing.inc("recognizer_skipped_chunks", recognizer=self.name)
+            return True
+        return False
+
+    @property
+    def decode_partials(self):
+        """Whether to ask for a partial result on this chunk"""
+        return not self.overloaded or self.chunks % PARTIAL_EVERY == 0
+
+    def observe(self, processing_seconds, queue_depth=0):
+        """Record the time spent recognizing one chunk"""
+        self.chunks += 1
+        rtf = processing_seconds / self.chunk_seconds
+        self.rtf = rtf if self.chunks == 1 else (1 - RTF_SMOOTHING) * self.rtf + RTF_SMOOTHING * rtf
+        self.peak_rtf = max(self.peak_rtf, rtf)
+
+        tracing.set_gauge("recognizer_rtf", round(self.rtf, 4), recognizer=self.name)
+        tracing.set_gauge("capture_queue_depth", queue_depth, recognizer=self.name)
+
+        if not self.adaptive:
+            return
+
+        behind = self.rtf > OVERLOAD_RTF or queue_depth >= OVERLOAD_QUEUE_CHUNKS
+        if behind and not self.overloaded:
+            self.overloaded = True
+            tracing.inc("recognizer_overloads", recognizer=self.name)
+            self._warn(f"⚠️ [{self.name}] Recognizer falling behind real time "
+                       f"(RTF {self.rtf:.2f}, {queue_depth} chunks queued) → shedding partials and silence")
+        elif self.overloaded and self.rtf < RECOVER_RTF and queue_depth < OVERLOAD_QUEUE_CHUNKS // 2:
+            self.overloaded = False
+            print(f"🟢 [{self.name}] Recognizer caught up (RTF {self.rtf:.2f})")
+
+        losses = self._losses()
+        if losses > self._last_losses:
+            self._warn(f"⚠️ [{self.name}] Lost {losses - self._last_losses} audio chunk(s) "
+                       f"before recognition ({capture_summary()})")
+            self._last_losses = losses
+
+    def _warn(self, message):
+        now = time.time()
+        if now - self._last_warning >= WARN_INTERVAL:
+            self._last_warning = now
+            print(message)
+
+    def summary(self):
+        return (f"RTF {self.rtf:.2f} (peak {self.peak_rtf:.2f}), "
+                f"{self.chunks} chunks, {self.skipped} skipped")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# audio_io.py - Pluggable audio sources (mic / WAV replay / PCM pipe) and output sinks (speakers / null)
+
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+import wave
+import audio_health
+
+SAMPLE_WIDTH = 2  # 16-bit PCM everywhere
+
+# ────────────────────────────────────────────────
+# SOURCES
+# ────────────────────────────────────────────────
+# A source yields fixed-size chunks of 16-bit mono PCM from read() and
+# returns b"" once it is exhausted. CaptureStream drives it on its own thread.
+
+
+class MicrophoneSource:
+    """Live microphone input through PyAudio.
+
+    Runs in callback mode so PortAudio's overflow/underflow status flags are
+    counted (audio_health.capture_stats) instead of silently discarded; the
+    callback hands chunks to read() through a bounded buffer.
+    """
+
+    realtime = True
+    BUFFER_CHUNKS = 64  # ~4 s at 1024 samples / 16 kHz
+
+    def __init__(self, rate=16000, channels=1, chunk=1024):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self._pa = None
+        self._stream = None
+        self._buffer = queue.Queue(maxsize=self.BUFFER_CHUNKS)
+
+    @property
+    def queue_depth(self):
+        return self._buffer.qsize()
+
+    def open(self):
+        import pyaudio  # only needed for live capture
+        self._pyaudio = pyaudio
+        self._buffer = queue.Queue(maxsize=self.BUFFER_CHUNKS)
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(format=pyaudio.paInt16,
+                                     channels=self.channels,
+                                     rate=self.rate,
+                                     input=True,
+                                     frames_per_buffer=self.chunk,
+                                     stream_callback=self._callback)
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & self._pyaudio.paInputOverflow:
+            audio_health.count("overflows")
+        if status & self._pyaudio.paInputUnderflow:
+            audio_health.count("underflows")
+        try:
+            self._buffer.put_nowait(in_data)
+        except queue.Full:
+            audio_health.count("dropped_chunks")
+        return (None, self._pyaudio.paContinue)
+
+    def read(self):
+        return self._buffer.get()
+
+    def close(self):
+        if self._stream:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._pa:
+            self._pa.terminate()
+        self._stream = self._pa = None
+        try:
+            self._buffer.put_nowait(b"")  # unblock a pending read()
+        except queue.Full:
+            pass
+
+
+class WavReplaySource:
+    """Replays a WAV file, or every *.wav in a directory in name order.
+
+    realtime=True paces chunks at the audio rate like a microphone would;
+    realtime=False delivers them as fast as the consumer reads. gap_seconds of
+    silence (longer than the recorder's SILENCE_DURATION) is inserted after each
+    file so the recorder sees the utterance end.
+    """
+
+    def __init__(self, path, rate=16000, channels=1, chunk=1024, realtime=True, gap_seconds=2.0):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.realtime = realtime
+        self.gap_seconds = gap_seconds
+        if os.path.isdir(path):
+            self.files = sorted(glob.glob(os.path.join(path, "*.wav")))
+        else:
+            self.files = [path]
+        if not self.files:
+            raise ValueError(f"No WAV files found at {path}")
+        self.current_file = None
+        self.marks = []          # (file, wall-clock time its first chunk was delivered)
+        self._index = 0
+        self._wav = None
+        self._gap_left = 0
+        self._next_deadline = None
+
+    def open(self):
+        self._index = 0
+        self._open_next()
+        self._next_deadline = time.monotonic()
+
+    def _open_next(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+        if self._index >= len(self.files):
+            self.current_file = None
+            return
+        path = self.files[self._index]
+        self._index += 1
+        wf = wave.open(path, "rb")
+        if wf.getnchannels() != self.channels or wf.getsampwidth() != SAMPLE_WIDTH or wf.getframerate() != self.rate:
+            wf.close()
+            raise ValueError(f"{path}: expected {self.rate} Hz, {self.channels} channel(s), 16-bit PCM")
+        self._wav = wf
+        self.current_file = path
+        self.marks.append((path, time.time()))
+        self._gap_left = int(self.gap_seconds * self.rate)
+
+    def _pace(self):
+        if not self.realtime:
+            return
+        self._next_deadline += self.chunk / self.rate
+        delay = self._next_deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self):
+        frame_bytes = self.chunk * self.channels * SAMPLE_WIDTH
+        while self._wav is not None:
+            data = self._wav.readframes(self.chunk)
+            if data:
+                self._pace()
+                return data.ljust(frame_bytes, b"\0")
+            if self._gap_left > 0:
+                self._gap_left -= self.chunk
+                self._pace()
+                return b"\0" * frame_bytes
+            self._open_next()
+        return b""
+
+    def close(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+
+
+class PcmPipeSource:
+    """Raw 16-bit little-endian PCM from a pipe, FIFO or file ('-' for stdin).
+    The producer sets the pace; reads block until a full chunk is available."""
+
+    realtime = False
+
+    def __init__(self, path="-", rate=16000, channels=1, chunk=1024):
+        self.path = path
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self._fh = None
+
+    def open(self):
+        self._fh = sys.stdin.buffer if self.path == "-" else open(self.path, "rb")
+
+    def read(self):
+        frame_bytes = self.chunk * self.channels * SAMPLE_WIDTH
+        data = self._fh.read(frame_bytes)
+        if not data:
+            return b""
+        return data.ljust(frame_bytes, b"\0")
+
+    def close(self):
+        if self._fh and self._fh is not sys.stdin.buffer:
+            self._fh.close()
+        self._fh = None
+
+
+def source_from_spec(spec, rate=16000, channels=1, chunk=1024):
+    """Build a source from a spec string:
+
+    mic                  live microphone (default)
+    wav:<file|dir>       WAV replay in real time
+    wav-fast:<file|dir>  WAV replay as fast as possible
+    pipe:<path|->        raw PCM from a pipe/FIFO/stdin
+    """
+    kind, _, arg = (spec or "mic").partition(":")
+    if kind == "mic":
+        return MicrophoneSource(rate, channels, chunk)
+    if kind in ("wav", "wav-fast"):
+        return WavReplaySource(arg, rate, channels, chunk, realtime=(kind == "wav"))
+    if kind == "pipe":
+        return PcmPipeSource(arg or "-", rate, channels, chunk)
+    raise ValueError(f"Unknown audio source '{spec}' (use mic, wav:, wav-fast: or pipe:)")
+
+
+# ────────────────────────────────────────────────
+# SINKS
+# ────────────────────────────────────────────────
+# A sink starts playing an audio file without blocking and returns its
+# duration in seconds; stop() cuts the current playback.
+
+# Edge TTS renders 24 kHz / 48 kbit/s mono MP3
+EDGE_TTS_BYTES_PER_SECOND = 6000
+
+
+class PygameSink:
+    """Real playback through the pygame mixer"""
+
+    def __init__(self):
+        os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "1"
+        import pygame
+        pygame.mixer.init()
+        self._pygame = pygame
+        self._channel = None
+
+    def play(self, audio_file):
+        sound = self._pygame.mixer.Sound(audio_file)
+        self._channel = sound.play()
+        return sound.get_length()
+
+    def stop(self):
+        if self._channel is not None:
+            self._channel.stop()
+            self._channel = None
+
+
+class NullSink:
+    """Plays nothing and records when each file would have played.
+
+    With realtime=True the reported duration is estimated from the MP3 size so
+    the assistant waits as long as real playback would; otherwise playback
+    completes instantly.
+    """
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.timings = []
+        self._lock = threading.Lock()
+
+    def play(self, audio_file):
+        try:
+            duration = os.path.getsize(audio_file) / EDGE_TTS_BYTES_PER_SECOND
+        except OSError:
+            duration = 0.0
+        with self._lock:
+            self.timings.append({"file": audio_file, "started": time.time(),
+                                 "duration": duration, "stopped": None})
+        return duration if self.realtime else 0.0
+
+    def stop(self):
+        with self._lock:
+            if self.timings and self.timings[-1]["stopped"] is None:
+                self.timings[-1]["stopped"] = time.time()
+
+
+def sink_from_spec(spec):
+    """pygame (default), null, or null-realtime"""
+    if spec in (None, "", "pygame"):
+        return PygameSink()
+    if spec == "null":
+        return NullSink()
+    if spec == "null-realtime":
+        return NullSink(realtime=True)
+    raise ValueError(f"Unknown audio sink '{spec}' (use pygame, null or null-realtime)")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# check_conditioning.py - Sanity checks for audio_conditioning on synthetic clips
+#
+# Speech-like clips (noise carrier with a 4 Hz syllable envelope) must survive
+# condition_audio whole, whatever share of the clip they fill; silence and
+# clicks must not survive at all. Exits non-zero on the first failure.
+#
+# Usage:
+#   python bench/check_conditioning.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from audio_conditioning import condition_audio
+
+RATE = 16000
+rng = np.random.default_rng(0)
+
+
+def speech(seconds, floor, rms=3000):
+    """Speech-band noise whose envelope dips to `floor` between syllables"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    envelope = floor + (1 - floor) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    carrier = np.convolve(rng.normal(0, 1, len(t)), np.ones(6) / 6, mode="same")
+    x = envelope * carrier
+    return x * rms / np.sqrt(np.mean(x * x))
+
+
+def silence(seconds, rms=0.0):
+    return rng.normal(0, rms, int(RATE * seconds)) if rms else np.zeros(int(RATE * seconds))
+
+
+def over_noise(snr_db, noise_rms=700):
+    """1.5 s of speech at snr_db over steady noise, with a second of noise either side"""
+    clean = np.concatenate([silence(1), speech(1.5, 0.3, noise_rms * 10 ** (snr_db / 20)), silence(1)])
+    return clean + silence(len(clean) / RATE, noise_rms)
+
+
+CASES = [
+    # (name, samples, ms of speech that must be kept - None if nothing may be)
+    ("command with silence around it", np.concatenate([silence(1, 80), speech(1.2, 0.2), silence(2, 80)]), 1200),
+    ("mostly speech, no leading silence", speech(2.5, 0.2), 2500),
+    ("mostly speech, 0.3 s leading silence", np.concatenate([silence(0.3), speech(2.5, 0.4)]), 2500),
+    ("speech only, flat envelope", speech(2.0, 0.9), 2000),
+    ("speech 8 dB over steady noise", over_noise(8), 1500),
+    ("quiet room", silence(3, 80), None),
+    ("single click", np.concatenate([silence(1), np.full(480, 20000.0), silence(1)]), None),
+]
+
+
+def main():
+    failed = 0
+    for name, samples, speech_ms in CASES:
+        pcm = np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+        out, stats = condition_audio(pcm, RATE)
+        if speech_ms is None:
+            ok = out is None and not stats["speech"]
+        else:
+            ok = out is not None and stats["ms"] >= speech_ms
+        failed += not ok
+        print(f"{'✅' if ok else '❌'} {name}: speech={stats['speech']}, kept {stats['ms']:.0f} of {stats['original_ms']:.0f} ms")
+    if failed:
+        sys.exit(f"{failed} conditioning check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# edge_tts.py - Offline stand-in for the edge_tts package used by the benchmark
+#
+# Put bench/fakes first on sys.path and `import edge_tts` resolves here.
+
+import asyncio
+import os
+
+# Synthesis latency model (seconds); the benchmark overrides these
+BASE_LATENCY = float(os.getenv("FAKE_TTS_BASE_MS", "150")) / 1000
+PER_CHAR_LATENCY = float(os.getenv("FAKE_TTS_PER_CHAR_MS", "2")) / 1000
+
+# Roughly 15 characters of speech per second at 48 kbit/s (6000 bytes/s), like the real MP3s
+CHARS_PER_SECOND = 15
+BYTES_PER_SECOND = 6000
+
+calls = []  # (text, seconds spent) for every save()
+
+
+class Communicate:
+    def __init__(self, text, voice=None, **kwargs):
+        self.text = text
+        self.voice = voice
+
+    async def save(self, path):
+        delay = BASE_LATENCY + PER_CHAR_LATENCY * len(self.text)
+        await asyncio.sleep(delay)
+        size = int(len(self.text) / CHARS_PER_SECOND * BYTES_PER_SECOND)
+        with open(path, "wb") as f:
+            f.write(b"\xff\xf3" + b"\0" * max(0, size - 2))
+        calls.append((self.text, delay))
@@ -0,0 +1,59 @@
+# spotipy - Offline stand-in for the spotipy client used by the benchmark
+
+import os
+import time
+
+# Per-call Web API latency (seconds); the benchmark overrides this
+LATENCY = float(os.getenv("FAKE_SPOTIFY_MS", "120")) / 1000
+
+calls = []  # (method, seconds spent)
+
+
+def _call(method):
+    time.sleep(LATENCY)
+    calls.append((method, LATENCY))
+
+
+class Spotify:
+    def __init__(self, auth_manager=None, **kwargs):
+        self.auth_manager = auth_manager
+        self._playing = False
+        self._item = None
+        self._volume = 50
+
+    def search(self, q, limit=10, type="track"):
+        _call("search")
+        track = {
+            "name": q.title() or "Unknown",
+            "uri": f"spotify:track:{abs(hash(q)) % 10**8:08d}",
+            "artists": [{"name": "Bench Artist"}],
+        }
+        return {"tracks": {"items": [track][:limit]}}
+
+    def start_playback(self, uris=None, context_uri=None, **kwargs):
+        _call("start_playback")
+        if uris:
+            self._item = {"name": "Bench Track", "uri": uris[0], "artists": [{"name": "Bench Artist"}]}
+        self._playing = True
+
+    def pause_playback(self, **kwargs):
+        _call("pause_playback")
+        self._playing = False
+
+    def current_playback(self, **kwargs):
+        _call("current_playback")
+        return {"is_playing": self._playing, "item": self._item}
+
+    def next_track(self, **kwargs):
+        _call("next_track")
+
+    def previous_track(self, **kwargs):
+        _call("previous_track")
+
+    def volume(self, volume_percent, **kwargs):
+        _call("volume")
+        self._volume = volume_percent
+
+    def current_user_playlists(self, limit=50, **kwargs):
+        _call("current_user_playlists")
+        return {"items": [{"name": "Bench Mix", "uri": "spotify:playlist:bench"}]}
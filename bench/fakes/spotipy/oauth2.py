@@ -0,0 +1,6 @@
+# spotipy.oauth2 - Offline stand-in; no tokens are ever requested
+
+
+class SpotifyOAuth:
+    def __init__(self, client_id=None, client_secret=None, redirect_uri=None, scope=None, cache_path=None, **kwargs):
+        self.scope = scope
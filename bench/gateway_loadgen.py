@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# gateway_loadgen.py - How many real-time sessions can one gateway sustain?
+#
+# Opens N concurrent sessions against a running gateway.py, streams audio to
+# each at exactly real-time pace (like N microphones), and measures how far
+# behind real time the gateway's partial/final results arrive. N is ramped
+# until the lag or the server's real-time factor goes over budget.
+#
+# Usage:
+#   python gateway.py --port 8765 &
+#   python bench/gateway_loadgen.py --port 8765 --sessions 1,2,4,8,16,32 --duration 20
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+import wave
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+from gateway import AUDIO, END, EVENT, HELLO, encode_frame, read_frame
+
+RATE = 16000
+
+
+def load_audio(path, chunk):
+    """16 kHz mono PCM to loop, padded to whole chunks"""
+    if path is None:
+        fixtures = sorted(glob.glob(os.path.join(BENCH_DIR, "fixtures", "*.wav")))
+        path = fixtures[0] if fixtures else None
+
+    if path:
+        with wave.open(path, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != RATE:
+                raise SystemExit(f"{path}: expected 16 kHz mono 16-bit PCM")
+            pcm = wf.readframes(wf.getnframes())
+        # Trailing silence so every pass ends an utterance
+        pcm += b"\0" * (2 * RATE * 3 // 2)
+    else:
+        # No fixture: 1.5 s bursts of speech-band noise followed by 1.5 s of silence
+        rng = np.random.default_rng(0)
+        burst = rng.normal(0, 3000, int(RATE * 1.5))
+        burst = np.convolve(burst, np.ones(8) / 8, mode="same")
+        samples = np.concatenate([burst, np.zeros(int(RATE * 1.5))])
+        pcm = np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+    chunk_bytes = chunk * 2
+    return pcm.ljust(-(-len(pcm) // chunk_bytes) * chunk_bytes, b"\0"), path or "synthetic"
+
+
+async def read_events(reader, start, result):
+    """Collect gateway events for one session and measure result lag"""
+    while True:
+        kind, payload = await read_frame(reader)
+        if kind is None:
+            return
+        if kind != EVENT:
+            continue
+        event = json.loads(payload)
+        name = event.get("event")
+        if "stream_ms" in event:
+            # The audio at stream_ms finished being sent at start + stream_ms
+            lag = time.monotonic() - (start + event["stream_ms"] / 1000)
+            result["lags"].append(lag)
+            if name == "final":
+                result["final_lags"].append(lag)
+        elif name == "busy" and event.get("active"):
+            result["busy"] += 1
+        elif name == "error":
+            result["errors"].append(event.get("message"))
+        elif name == "stats":
+            result["server"] = event
+            return
+
+
+async def run_session(args, level, index, audio):
+    result = {"lags": [], "final_lags": [], "busy": 0, "errors": [], "server": None, "send_behind": 0.0}
+    try:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    except OSError as e:
+        result["errors"].append(str(e))
+        return result
+
+    hello = {"session": f"load-{level}-{index}", "lang": args.lang, "rate": RATE, "chunk": args.chunk,
+             "ask": args.ask, "partials": True}
+    writer.write(encode_frame(HELLO, json.dumps(hello).encode("utf-8")))
+    await writer.drain()
+    kind, payload = await read_frame(reader)
+    ready = json.loads(payload) if kind == EVENT else {}
+    if ready.get("event") != "ready":
+        result["errors"].append(ready.get("message", "no ready event"))
+        writer.close()
+        return result
+
+    chunk_seconds = args.chunk / RATE
+    chunk_bytes = args.chunk * 2
+    # Stagger sessions across one chunk period, like independent microphones
+    start = time.monotonic() + index * chunk_seconds / level
+    events = asyncio.create_task(read_events(reader, start, result))
+
+    try:
+        for i in range(int(args.duration / chunk_seconds)):
+            delay = start + (i + 1) * chunk_seconds - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                result["send_behind"] = max(result["send_behind"], -delay)
+            offset = (i * chunk_bytes) % len(audio)
+            writer.write(encode_frame(AUDIO, audio[offset:offset + chunk_bytes]))
+            await writer.drain()  # blocks when the gateway is applying backpressure
+        writer.write(encode_frame(END))
+        await writer.drain()
+        await asyncio.wait_for(events, timeout=args.drain_timeout)
+    except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError) as e:
+        result["errors"].append(type(e).__name__)
+        events.cancel()
+    finally:
+        writer.close()
+    return result
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else None
+
+
+async def run_level(args, level, audio):
+    results = await asyncio.gather(*(run_session(args, level, i, audio) for i in range(level)))
+
+    lags = [lag for r in results for lag in r["lags"]]
+    final_lags = [lag for r in results for lag in r["final_lags"]]
+    servers = [r["server"] for r in results if r["server"]]
+    errors = [e for r in results for e in r["errors"]]
+    summary = {
+        "sessions": level,
+        "results": len(lags),
+        "finals": len(final_lags),
+        "lag_p50_ms": percentile(lags, 50),
+        "lag_p95_ms": percentile(lags, 95),
+        "lag_max_ms": percentile(lags, 100),
+        "final_lag_p95_ms": percentile(final_lags, 95),
+        "server_rtf_mean": round(float(np.mean([s["rtf"] for s in servers])), 3) if servers else None,
+        "server_rtf_peak": round(max(s["peak_rtf"] for s in servers), 3) if servers else None,
+        "server_max_queue": max((s["max_queue"] for s in servers), default=None),
+        "busy_events": sum(r["busy"] for r in results),
+        "send_behind_ms": round(max(r["send_behind"] for r in results) * 1000, 1),
+        "errors": errors,
+    }
+    summary["sustained"] = (
+        not errors
+        and len(servers) == level
+        and summary["lag_p95_ms"] is not None
+        and summary["lag_p95_ms"] <= args.max_lag_ms
+        and summary["busy_events"] == 0
+    )
+    return summary
+
+
+def print_level(s):
+    def ms(v):
+        return f"{v:.0f}" if v is not None else "-"
+    print(f"{s['sessions']:>8}{s['results']:>9}{ms(s['lag_p50_ms']):>10}{ms(s['lag_p95_ms']):>10}"
+          f"{ms(s['final_lag_p95_ms']):>12}{str(s['server_rtf_mean']):>10}{str(s['server_max_queue']):>8}"
+          f"{s['busy_events']:>6}   {'✅' if s['sustained'] else '❌'}"
+          + (f"  {len(s['errors'])} error(s): {s['errors'][0]}" if s["errors"] else ""))
+
+
+async def main_async(args):
+    audio, source = load_audio(args.wav, args.chunk)
+    print(f"🎧 Streaming {source} in real time, {args.duration:.0f} s per session, lag budget {args.max_lag_ms:.0f} ms\n")
+    print(f"{'sessions':>8}{'results':>9}{'p50 lag':>10}{'p95 lag':>10}{'final p95':>12}{'RTF':>10}{'queue':>8}{'busy':>6}")
+
+    levels = []
+    best = 0
+    for level in args.sessions:
+        summary = await run_level(args, level, audio)
+        levels.append(summary)
+        print_level(summary)
+        if summary["sustained"]:
+            best = level
+        elif not args.keep_going:
+            break
+
+    if best:
+        print(f"\n✅ One gateway sustained {best} concurrent real-time session(s)")
+    else:
+        print("\n❌ The gateway could not keep up with a single session within the lag budget")
+    return {"source": source, "max_lag_ms": args.max_lag_ms, "max_sustained_sessions": best, "levels": levels}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent real-time sessions against an ATLAS gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sessions", default="1,2,4,8,16,32",
+                        type=lambda s: [int(n) for n in s.split(",")], help="comma-separated ramp")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of audio per session")
+    parser.add_argument("--wav", help="16 kHz mono WAV to loop (default: first bench fixture, else synthetic)")
+    parser.add_argument("--lang", help="session language (default: the gateway's first model)")
+    parser.add_argument("--chunk", type=int, default=1024, help="samples per audio frame")
+    parser.add_argument("--max-lag-ms", type=float, default=500, help="p95 result lag that still counts as real time")
+    parser.add_argument("--ask", action="store_true", help="also send utterances to /api/ask")
+    parser.add_argument("--drain-timeout", type=float, default=30, help="seconds to wait for results after the audio ends")
+    parser.add_argument("--keep-going", action="store_true", help="continue the ramp after a failing level")
+    parser.add_argument("--out", help="write the results JSON here")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📄 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
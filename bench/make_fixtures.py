@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# make_fixtures.py - Regenerate the benchmark's synthetic WAV corpus in bench/fixtures
+#
+# Every fixture is a seeded, speech-like utterance (voiced syllables through
+# vowel formants, with consonant noise) as long as its command would take to
+# say, plus a .txt sidecar with the command. The corpus covers each route in
+# voice_client.py: /api/ask, Spotify play and controls, system commands and
+# search. Output is byte-for-byte reproducible, so the committed corpus can be
+# checked against this script.
+#
+# Usage:
+#   python bench/make_fixtures.py            # rewrite bench/fixtures
+#   python bench/make_fixtures.py --out /tmp/corpus
+
+import argparse
+import os
+import wave
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RATE = 16000
+SEED = 2024
+
+# (file name, command) - what the stub's /api/transcribe-groq returns for the fixture
+CORPUS = [
+    ("01_ask_weather", "what's the weather like today"),
+    ("02_ask_joke", "tell me a joke"),
+    ("03_ask_long", "explain how a rainbow forms in two sentences"),
+    ("04_play_track", "play bohemian rhapsody"),
+    ("05_pause", "pause the music"),
+    ("06_volume", "volume up"),
+    ("07_open_site", "open youtube"),
+    ("08_search", "search for pasta recipes"),
+]
+
+# (F1, F2, F3) in Hz for a few vowels
+VOWELS = [(730, 1090, 2440), (530, 1840, 2480), (270, 2290, 3010), (570, 840, 2410), (300, 870, 2240)]
+
+SYLLABLES_PER_SECOND = 4.0
+LEAD_SECONDS = 0.3
+TAIL_SECONDS = 0.5
+LEVEL_RMS = 3000              # well above SILENCE_THRESHOLD, like a close microphone
+
+
+def _syllables(text):
+    """Rough syllable count: vowel groups per word, at least one"""
+    count = 0
+    for word in text.split():
+        groups = sum(1 for i, c in enumerate(word) if c in "aeiouy" and (i == 0 or word[i - 1] not in "aeiouy"))
+        count += max(1, groups)
+    return count
+
+
+def _formant_response(formants, n=400):
+    t = np.arange(n) / RATE
+    return sum(np.exp(-np.pi * 80 * t) * np.sin(2 * np.pi * f * t) for f in formants)
+
+
+def _syllable(rng, seconds, pitch):
+    n = int(RATE * seconds)
+    # Glottal pulses with a little jitter, shaped by a random vowel
+    source = np.zeros(n)
+    position = 0.0
+    while position < n:
+        source[int(position)] = 1.0
+        position += RATE / (pitch * rng.uniform(0.97, 1.03))
+    voiced = np.convolve(source, _formant_response(VOWELS[rng.integers(len(VOWELS))]))[:n]
+
+    # Consonant: a short burst of noise at the onset
+    burst = int(n * rng.uniform(0.1, 0.3))
+    voiced[:burst] += rng.normal(0, np.std(voiced) * 0.6, burst)
+
+    envelope = np.sin(np.pi * np.arange(n) / n) ** 0.6
+    return voiced * envelope
+
+
+def utterance(text, rng):
+    """Speech-like samples (float) for one command, with silence around it"""
+    pitch = rng.uniform(100, 180)
+    parts = [np.zeros(int(RATE * LEAD_SECONDS))]
+    for _ in range(_syllables(text)):
+        parts.append(_syllable(rng, rng.uniform(0.7, 1.3) / SYLLABLES_PER_SECOND, pitch))
+        parts.append(np.zeros(int(RATE * rng.uniform(0.01, 0.05))))
+    speech = np.concatenate(parts[1:])
+    speech *= LEVEL_RMS / np.sqrt(np.mean(speech * speech))
+    # Faint room noise so the leading/trailing silence isn't digital zero
+    samples = np.concatenate([parts[0], speech, np.zeros(int(RATE * TAIL_SECONDS))])
+    return samples + rng.normal(0, 40, len(samples))
+
+
+def generate(out_dir):
+    """Write every fixture (WAV + .txt) to out_dir; returns the WAV paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(SEED)
+    paths = []
+    for name, text in CORPUS:
+        pcm = np.clip(utterance(text, rng), -32768, 32767).astype(np.int16).tobytes()
+        path = os.path.join(out_dir, f"{name}.wav")
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(RATE)
+            wf.writeframes(pcm)
+        with open(os.path.join(out_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the synthetic benchmark corpus")
+    parser.add_argument("--out", default=os.path.join(BENCH_DIR, "fixtures"), help="output directory")
+    args = parser.parse_args()
+    paths = generate(args.out)
+    print(f"🎧 Wrote {len(paths)} fixtures to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
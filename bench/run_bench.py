@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# run_bench.py - Offline end-to-end latency benchmark for the voice client
+#
+# Replays a corpus of WAV fixtures through the real record → transcribe →
+# route → ask → synthesize → play pipeline in voice_client.py, with the ATLAS
+# API, Edge TTS and Spotify replaced by local stand-ins, and writes per-stage
+# p50/p95/p99 to a JSON file that can be compared between commits.
+#
+# Usage:
+#   python bench/run_bench.py --model /path/to/vosk-model          # committed corpus in bench/fixtures
+#   python bench/run_bench.py ... --out after.json --compare before.json
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+# Fakes must shadow the real edge_tts / spotipy before voice_client is imported
+sys.path.insert(0, os.path.join(BENCH_DIR, "fakes"))
+sys.path.insert(1, REPO_DIR)
+
+import numpy as np
+from stub_server import StubConfig, start_stub_server
+
+
+class StageRecorder:
+    """Thread-safe collection of stage durations (seconds)"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        out = {}
+        with self._lock:
+            items = {k: list(v) for k, v in self.samples.items()}
+        for stage, values in sorted(items.items()):
+            ms = np.array(values) * 1000.0
+            out[stage] = {
+                "count": int(len(ms)),
+                "mean_ms": round(float(ms.mean()), 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                "max_ms": round(float(ms.max()), 2),
+            }
+        return out
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def corpus_fingerprint(fixtures):
+    """Hash of every fixture's audio and transcript, so results are only compared on the same corpus"""
+    digest = hashlib.sha256()
+    for wav, transcript in fixtures:
+        digest.update(os.path.basename(wav).encode("utf-8"))
+        with open(wav, "rb") as f:
+            digest.update(f.read())
+        digest.update((transcript or "").encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def load_fixtures(path):
+    """(wav path, expected transcript or None) pairs; transcript comes from a .txt sidecar"""
+    files = sorted(glob.glob(os.path.join(path, "*.wav"))) if os.path.isdir(path) else [path]
+    fixtures = []
+    for wav in files:
+        sidecar = os.path.splitext(wav)[0] + ".txt"
+        transcript = None
+        if os.path.exists(sidecar):
+            with open(sidecar, encoding="utf-8") as f:
+                transcript = f.read().strip()
+        fixtures.append((wav, transcript))
+    return fixtures
+
+
+def misheard(transcript):
+    """A local transcript that disagrees with Whisper: the last word lost"""
+    words = transcript.split()
+    return " ".join(words[:-1]) if len(words) > 1 else f"{transcript} please"
+
+
+_purpose = threading.local()
+
+
+def _stage(name):
+    """Label a stage by why it ran, so e.g. p95 of "ask" only covers answers the user waited on"""
+    if threading.current_thread().name.startswith("atlas-speculate"):
+        return f"{name}.speculative"
+    purpose = getattr(_purpose, "name", None)
+    return f"{name}.{purpose}" if purpose else name
+
+
+def _for_purpose(purpose, fn):
+    def run(*args, **kwargs):
+        _purpose.name = purpose
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _purpose.name = None
+    return run
+
+
+def instrument(vc, recorder):
+    """Wrap the pipeline stages of an imported voice_client module"""
+    import api_client
+
+    post = api_client.post
+
+    def timed_post(endpoint, *args, **kwargs):
+        stage = _stage(endpoint.rsplit("/", 1)[-1])
+        start = time.perf_counter()
+        try:
+            return post(endpoint, *args, **kwargs)
+        finally:
+            recorder.add(stage, time.perf_counter() - start)
+
+    api_client.post = timed_post
+
+    vc.record_command = recorder.wrap("record", vc.record_command)
+    vc.parse_music_command = _for_purpose("parse_music", vc.parse_music_command)
+    vc.handle_music_command = recorder.wrap("music_intent", vc.handle_music_command)
+    vc.handle_system_command = recorder.wrap("system_intent", vc.handle_system_command)
+
+    synthesize = vc.synthesize
+
+    def timed_synthesize(text):
+        stage = _stage("synthesize")
+        start = time.perf_counter()
+        try:
+            return synthesize(text)
+        finally:
+            recorder.add(stage, time.perf_counter() - start)
+
+    vc.synthesize = timed_synthesize
+    vc.speaker._synthesize = timed_synthesize
+
+    import spotify_control
+    for name in ("search", "start_playback", "current_playback", "pause_playback",
+                 "next_track", "previous_track", "volume", "current_user_playlists"):
+        setattr(spotify_control.sp, name, recorder.wrap("spotify", getattr(spotify_control.sp, name)))
+
+
+def run(args):
+    stub_cfg = StubConfig(args.transcribe_ms, args.ask_ms, args.jitter_ms, args.stream, seed=args.seed)
+    server, url = start_stub_server(stub_cfg)
+
+    # Configure voice_client before it reads its environment at import time
+    os.environ["ATLAS_API_URL"] = url
+    os.environ["ATLAS_AUDIO_SINK"] = "null-realtime" if args.realtime else "null"
+    os.environ["ATLAS_BARGE_IN"] = "0"
+    os.environ["ATLAS_HISTORY"] = "0"  # every run starts from an empty conversation
+    os.environ["ATLAS_SYSTEM_COMMANDS"] = "remote"  # "open youtube" hits the stub, not a browser
+    if args.model:
+        os.environ["VOSK_MODEL_PATH"] = args.model
+
+    import edge_tts
+    import spotipy
+    edge_tts.BASE_LATENCY = args.tts_base_ms / 1000
+    edge_tts.PER_CHAR_LATENCY = args.tts_per_char_ms / 1000
+    spotipy.LATENCY = args.spotify_ms / 1000
+
+    import voice_client as vc
+    from audio_io import WavReplaySource
+    from capture import CaptureStream
+
+    import tracing
+    if args.trace:
+        tracing.configure(enable=True, trace_file=args.trace)
+
+    recorder = StageRecorder()
+    instrument(vc, recorder)
+    sink = vc.speaker._sink
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        sys.exit(f"No WAV fixtures found at {args.fixtures} (python bench/make_fixtures.py rebuilds the default corpus)")
+
+    # Model load is reported on its own, not as part of the first turn
+    recorder.wrap("model_load", vc.get_model)()
+    turns = []
+    # Seeded separately from the stub; each run mishears a different --miss-rate share
+    miss_rng = random.Random(args.seed)
+
+    for run_index in range(args.runs):
+        misses = set(miss_rng.sample(range(len(fixtures)), round(args.miss_rate * len(fixtures))))
+        for index, (wav, transcript) in enumerate(fixtures):
+            source = WavReplaySource(wav, vc.RATE, vc.CHANNELS, vc.CHUNK, realtime=args.realtime, gap_seconds=0)
+            vc.capture = CaptureStream(source)
+            vc.capture.start()
+            try:
+                audio_b64, last_text, _ = vc.record_command()
+            finally:
+                vc.capture.close()
+
+            local_source = "vosk"
+            if args.local_text == "transcript" or (args.local_text == "auto" and not last_text and transcript):
+                last_text, local_source = transcript, "transcript"
+                # A sidecar always agrees with the stub's Whisper text; mishear some
+                # turns so the non-speculative path is measured too
+                if index in misses:
+                    last_text, local_source = misheard(transcript), "transcript-misheard"
+
+            if not audio_b64 or not last_text:
+                print(f"⏭  {os.path.basename(wav)}: no speech detected, skipped")
+                continue
+
+            stub_cfg.transcript = transcript if transcript is not None else last_text
+            plays_before = len(sink.timings)
+
+            if args.trace:
+                tracing.new_turn()
+            start = time.perf_counter()
+            wall_start = time.time()
+            vc.process_command(audio_b64, last_text)
+            elapsed = time.perf_counter() - start
+
+            first_audio = None
+            if len(sink.timings) > plays_before:
+                first_audio = sink.timings[plays_before]["started"] - wall_start
+                recorder.add("time_to_first_audio", first_audio)
+            recorder.add("turn", elapsed)
+
+            turns.append({
+                "run": run_index,
+                "fixture": os.path.basename(wav),
+                "local_text": last_text,
+                "local_source": local_source,
+                "transcript": stub_cfg.transcript,
+                "turn_ms": round(elapsed * 1000, 2),
+                "first_audio_ms": round(first_audio * 1000, 2) if first_audio is not None else None,
+            })
+            print(f"✅ {os.path.basename(wav)}: {elapsed * 1000:.0f} ms")
+
+    server.shutdown()
+
+    import speculation
+    # Hits on sidecar text are set by --miss-rate, not measured - keep them out of
+    # the comparable results
+    simulated = any(t["local_source"] != "vosk" for t in turns)
+    stats = dict(speculation.speculation_stats)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "fixtures": len(fixtures),
+            "corpus": corpus_fingerprint(fixtures),
+            "runs": args.runs,
+            "config": {
+                "transcribe_ms": args.transcribe_ms,
+                "ask_ms": args.ask_ms,
+                "jitter_ms": args.jitter_ms,
+                "stream": args.stream,
+                "tts_base_ms": args.tts_base_ms,
+                "tts_per_char_ms": args.tts_per_char_ms,
+                "spotify_ms": args.spotify_ms,
+                "realtime": args.realtime,
+                "local_text": args.local_text,
+                "miss_rate": args.miss_rate,
+            },
+        },
+        "stages": recorder.summary(),
+        "speculation": None if simulated else stats,
+        "speculation_simulated": stats if simulated else None,
+        "turns": turns,
+    }
+
+
+def print_summary(results, baseline=None):
+    base = (baseline or {}).get("stages", {})
+    if base and baseline["meta"].get("corpus") != results["meta"]["corpus"]:
+        print(f"\n⚠️  Baseline was measured on a different corpus "
+              f"({baseline['meta'].get('corpus')} vs {results['meta']['corpus']}) - deltas are not comparable")
+    print(f"\n{'stage':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}" + ("   Δp50 / Δp95" if base else ""))
+    for stage, st in results["stages"].items():
+        line = f"{stage:<22}{st['count']:>6}{st['p50_ms']:>10.1f}{st['p95_ms']:>10.1f}{st['p99_ms']:>10.1f}"
+        if stage in base:
+            line += f"   {st['p50_ms'] - base[stage]['p50_ms']:+.1f} / {st['p95_ms'] - base[stage]['p95_ms']:+.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark for ATLAS")
+    parser.add_argument("--fixtures", default=os.path.join(BENCH_DIR, "fixtures"),
+                        help="WAV file or directory of 16 kHz mono WAVs (+ optional .txt transcripts)")
+    parser.add_argument("--local-text", choices=["auto", "vosk", "transcript"], default="auto",
+                        help="local transcript to speculate on: Vosk's, the .txt sidecar's, "
+                             "or Vosk's unless it heard nothing (the synthetic corpus isn't real words)")
+    parser.add_argument("--miss-rate", type=float, default=0.25,
+                        help="fraction of turns whose sidecar-based local text is made to disagree "
+                             "with Whisper, so speculation misses")
+    parser.add_argument("--model", help="Vosk model directory (defaults to the .env settings)")
+    parser.add_argument("--runs", type=int, default=3, help="passes over the corpus")
+    parser.add_argument("--realtime", action="store_true", help="replay audio and playback in real time")
+    parser.add_argument("--transcribe-ms", type=float, default=350)
+    parser.add_argument("--ask-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--stream", action="store_true", help="stream /api/ask responses in chunks")
+    parser.add_argument("--tts-base-ms", type=float, default=150)
+    parser.add_argument("--tts-per-char-ms", type=float, default=2)
+    parser.add_argument("--spotify-ms", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.add_argument("--trace", help="also write voice_client tracing spans to this JSONL file")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(results, baseline)
+    print(f"\n📄 Results written to {args.out}")
+    os._exit(0)  # don't wait on daemon threads (health probe, TTS workers)
+
+
+if __name__ == "__main__":
+    main()
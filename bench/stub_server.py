@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# stub_server.py - Local stand-in for the ATLAS API (/api/transcribe-groq, /api/ask, /health)
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    """Latency model for the stub endpoints (milliseconds)"""
+
+    def __init__(self, transcribe_ms=350, ask_ms=800, jitter_ms=50, stream=False, stream_chunks=8, seed=0):
+        self.transcribe_ms = transcribe_ms
+        self.ask_ms = ask_ms
+        self.jitter_ms = jitter_ms
+        self.stream = stream
+        self.stream_chunks = stream_chunks
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        # What /api/transcribe-groq returns next; set by the benchmark per fixture
+        self.transcript = ""
+        self.answer = "It is a quarter past ten and twenty three degrees outside."
+
+    def delay(self, base_ms):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, base_ms + jitter) / 1000.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config = None  # set by start_stub_server()
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_json(self, data, total_seconds):
+        """Send the body in chunks spread over total_seconds (chunked encoding)"""
+        body = json.dumps(data).encode("utf-8")
+        n = max(1, self.config.stream_chunks)
+        size = -(-len(body) // n)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(0, len(body), size):
+            time.sleep(total_seconds / n)
+            part = body[i:i + size]
+            self.wfile.write(f"{len(part):x}\r\n".encode("ascii") + part + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._send_json(200, {"status": "ok", "timestamp": time.time()})
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        cfg = self.config
+        data = self._read_json()
+
+        if self.path == "/api/transcribe-groq":
+            if not data.get("audio"):
+                return self._send_json(400, {"error": "Missing audio parameter"})
+            time.sleep(cfg.delay(cfg.transcribe_ms))
+            return self._send_json(200, {"transcription": cfg.transcript, "language": "en", "success": True})
+
+        if self.path == "/api/ask":
+            text = data.get("text")
+            if not text:
+                return self._send_json(400, {"error": "Missing text parameter"})
+            history = [m for m in data.get("conversationHistory", []) if m.get("role") != "system"]
+            result = {
+                "response": cfg.answer,
+                "conversationHistory": history + [
+                    {"role": "user", "content": text},
+                    {"role": "assistant", "content": cfg.answer},
+                ],
+            }
+            delay = cfg.delay(cfg.ask_ms)
+            if cfg.stream:
+                return self._stream_json(result, delay)
+            time.sleep(delay)
+            return self._send_json(200, result)
+
+        if self.path == "/api/system-commands":
+            return self._send_json(200, {"success": True, "message": f"Executed: {data.get('action')}"})
+
+        self._send_json(404, {"error": "Not found"})
+
+
+def start_stub_server(config, host="127.0.0.1", port=0):
+    """Start the stub in a daemon thread; returns (server, base_url)"""
+    handler = type("BoundStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="atlas-stub-api").start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the stub ATLAS API standalone")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--transcribe-ms", type=float, default=350)
+    parser.add_argument("--ask-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--stream", action="store_true", help="stream /api/ask responses in chunks")
+    parser.add_argument("--transcript", default="what time is it")
+    args = parser.parse_args()
+
+    cfg = StubConfig(args.transcribe_ms, args.ask_ms, args.jitter_ms, args.stream)
+    cfg.transcript = args.transcript
+    server, url = start_stub_server(cfg, port=args.port)
+    print(f"Stub ATLAS API running at {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
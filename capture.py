@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# capture.py - One shared audio stream fanned out to any number of listeners
+
+import queue
+import threading
+from collections import deque
+import audio_health
+import tracing
+from audio_io import MicrophoneSource, SAMPLE_WIDTH
+
+
+class CaptureStream:
+    """Reads an audio source on a background thread and publishes every chunk
+    to each subscriber's queue.
+
+    Recording, hibernate and barge-in detection all subscribe to the same
+    stream, so the mic never has to be closed and reopened between them. The
+    source defaults to the microphone; see audio_io for WAV replay and pipes.
+    Once the source is exhausted every subscriber receives b"".
+
+    Live sources drop audio for listeners that fall behind. Sources that are
+    not real-time (fast WAV replay, pipes) are lossless instead: capture waits
+    for a subscriber and for queue space, and chunks the last subscriber
+    never read are handed to the next one, so replays are deterministic.
+    """
+
+    def __init__(self, source=None, rate=16000, channels=1, chunk=1024):
+        self.source = source or MicrophoneSource(rate, channels, chunk)
+        self.rate = self.source.rate
+        self.channels = self.source.channels
+        self.chunk = self.source.chunk
+        self.sample_width = SAMPLE_WIDTH
+        self.lossless = not getattr(self.source, "realtime", True)
+        self._exhausted = False
+        self._backlog = deque()  # lossless: chunks published but never read
+        self._thread = None
+        self._running = threading.Event()
+        self._subscribers = []
+        self._lock = threading.Condition()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    @property
+    def finished(self):
+        """True once the source is exhausted and every chunk was handed out"""
+        return self._exhausted and not self._backlog
+
+    @property
+    def chunk_seconds(self):
+        return self.chunk / self.rate
+
+    def start(self):
+        if self._running.is_set():
+            return self
+        self.source.open()
+        self._exhausted = False
+        self._backlog.clear()
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="atlas-capture")
+        self._thread.start()
+        return self
+
+    def subscribe(self, maxsize=256):
+        """Return a queue that receives every captured chunk from now on"""
+        with self._lock:
+            q = queue.Queue(maxsize=max(maxsize, len(self._backlog) + 1))
+            while self._backlog:
+                q.put_nowait(self._backlog.popleft())
+            if self._exhausted:
+                q.put_nowait(b"")
+            else:
+                self._subscribers.append(q)
+                self._lock.notify_all()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+            # Also covers queues handed out after the source ran dry (never subscribed)
+            if self.lossless and not self._subscribers:
+                self._keep_unread(q)
+
+    def _keep_unread(self, q):
+        """Move chunks left in a lossless queue to the backlog (caller holds the lock)"""
+        while True:
+            try:
+                data = q.get_nowait()
+            except queue.Empty:
+                return
+            if data:
+                self._backlog.append(data)
+
+    def _publish(self, data):
+        with self._lock:
+            if self.lossless and data:
+                self._lock.wait_for(lambda: self._subscribers or not self._running.is_set())
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            if self.lossless and data:
+                self._put_blocking(q, data)
+                continue
+            try:
+                q.put_nowait(data)
+            except queue.Full:
+                # A stalled listener loses its oldest audio, never the capture thread
+                try:
+                    q.get_nowait()
+                    audio_health.count("dropped_chunks")
+                except queue.Empty:
+                    pass
+                q.put_nowait(data)
+
+    def _put_blocking(self, q, data):
+        with self._lock:
+            while self._running.is_set():
+                if q not in self._subscribers:
+                    # Unsubscribed while we waited: the next subscriber gets it
+                    if not self._subscribers:
+                        self._backlog.append(data)
+                    return
+                try:
+                    q.put_nowait(data)
+                    return
+                except queue.Full:
+                    self._lock.wait(0.1)
+
+    def _run(self):
+        while self._running.is_set():
+            try:
+                data = self.source.read()
+            except Exception as e:
+                print(f"❌ Capture error: {e}")
+                break
+            if not data:
+                break  # source exhausted (end of replay / pipe closed)
+            tracing.set_gauge("capture_buffer_depth", getattr(self.source, "queue_depth", 0))
+            self._publish(data)
+
+        # Wake anything blocked on a subscription
+        with self._lock:
+            self._exhausted = True
+        self._running.clear()
+        self._publish(b"")
+
+    def close(self):
+        self._running.clear()
+        with self._lock:
+            self._lock.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self.source.close()
+        self._thread = None
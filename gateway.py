@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# gateway.py - Multi-session voice gateway: many audio streams, one shared Vosk model
+#
+# One process serves every room/device. Each connected client gets its own
+# recognizer, endpointing and conversation history, while all recognizers
+# share a single loaded model and a thread pool.
+#
+# Usage:
+#   python gateway.py --port 8765 [--model /path/to/vosk-model] [--workers 8]
+#   python bench/gateway_loadgen.py --port 8765 --sessions 1,2,4,8,16
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import re
+import struct
+import time
+import uuid
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from dotenv import load_dotenv
+
+import api_client
+import tracing
+from audio_conditioning import condition_audio
+from audio_health import RecognizerMonitor
+from history_store import HistoryStore
+from vosk_models import ModelRegistry
+
+# ────────────────────────────────────────────────
+# PROTOCOL
+# ────────────────────────────────────────────────
+# Every frame is 1 type byte + 4-byte big-endian payload length + payload.
+#
+# client → gateway
+#   H  hello, JSON (all keys optional):
+#      {"session": "kitchen", "lang": "en", "rate": 16000, "chunk": 1024,
+#       "silence": 1.0, "partials": true, "ask": true}
+#   A  audio, raw 16-bit little-endian mono PCM
+#   E  end of stream - the last utterance is flushed and stats are sent
+#
+# gateway → client
+#   J  JSON event: ready | partial | final | reply | busy | stats | error
+#      partial/final carry "stream_ms", the position in the session's audio
+#      they were decided at, so clients can tell how far behind real time
+#      the gateway is running.
+
+HELLO = b"H"
+AUDIO = b"A"
+END = b"E"
+EVENT = b"J"
+
+_HEADER = struct.Struct(">cI")
+
+
+class ProtocolError(ValueError):
+    """The client sent something that is not a valid frame sequence"""
+
+
+def encode_frame(kind, payload=b""):
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_event(event):
+    return encode_frame(EVENT, json.dumps(event, ensure_ascii=False).encode("utf-8"))
+
+
+async def read_frame(reader, max_bytes=1 << 20):
+    """Next (kind, payload) from a stream, or (None, None) on a clean EOF"""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None, None
+        raise
+    kind, length = _HEADER.unpack(header)
+    if length > max_bytes:
+        raise ProtocolError(f"frame of {length} bytes exceeds the {max_bytes} byte limit")
+    return kind, await reader.readexactly(length)
+
+
+def parse_hello(payload):
+    """Session options from a hello frame; ProtocolError unless it is a JSON object
+    with positive integer rate and chunk"""
+    options = json.loads(payload or b"{}")
+    if not isinstance(options, dict):
+        raise ProtocolError("hello must be a JSON object")
+    for key in ("rate", "chunk"):
+        value = options.get(key, 1)
+        if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+            raise ProtocolError(f"hello '{key}' must be a positive integer, got {value!r}")
+    return options
+
+
+# ────────────────────────────────────────────────
+# CONFIG
+# ────────────────────────────────────────────────
+
+load_dotenv()
+
+HOST = os.getenv("ATLAS_GATEWAY_HOST", "127.0.0.1")
+PORT = int(os.getenv("ATLAS_GATEWAY_PORT", "8765"))
+
+MAX_SESSIONS = 64            # connections beyond this are turned away
+QUEUE_CHUNKS = 32            # per-session audio backlog (~2 s) before we stop reading its socket
+BUSY_CHUNKS = 24             # tell the client it is being throttled at this depth
+BATCH_CHUNKS = 8             # queued chunks handed to the recognizer pool in one hop
+MAX_FRAME_BYTES = 1 << 20
+HELLO_TIMEOUT = 5.0
+
+SILENCE_THRESHOLD = 500      # same energy scale as voice_client.py
+SILENCE_DURATION = 1.0       # default trailing silence that ends an utterance
+MAX_UTTERANCE_SECONDS = 10
+PREROLL_CHUNKS = 5           # audio kept from just before speech starts
+RESUME_TURNS = 10            # turns of stored history a reconnecting session resumes
+HISTORY_IDLE_SECONDS = 600   # a named session's history stays in memory this long after it disconnects
+MAX_IDLE_HISTORIES = 256     # ...and at most this many idle ones are kept
+
+NOISE_WORDS = {'', 'huh', 'uh', 'um', 'hmm', 'ah', 'oh', 'eh', 'a', 'the', 'i', 'it'}
+OFFLINE_REPLY = "I can't reach the server right now."
+
+
+def _rms(data):
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float64)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+def model_paths(model=None):
+    """Per-language model directories from .env; --model / VOSK_MODEL_PATH override English"""
+    return {"en": model or os.getenv("VOSK_MODEL_PATH") or os.getenv("VOSK_MODEL_PATH_EN"),
+            "el": os.getenv("VOSK_MODEL_PATH_EL")}
+
+
+# ────────────────────────────────────────────────
+# SESSION
+# ────────────────────────────────────────────────
+
+class Session:
+    """One connected audio stream.
+
+    The connection handler feeds audio into a bounded queue; run() drains it
+    in batches on the shared recognizer pool, so a session is recognized
+    strictly in order while sessions run in parallel with each other. When
+    the queue is full the handler stops reading the socket and TCP flow
+    control pushes back on the client.
+    """
+
+    def __init__(self, gateway, session_id, lang, writer, options):
+        self.gateway = gateway
+        self.id = session_id
+        self.lang = lang
+        self.rate = int(options.get("rate", 16000))
+        self.chunk = int(options.get("chunk", 1024))
+        self.silence_duration = float(options.get("silence", SILENCE_DURATION))
+        self.partials = bool(options.get("partials", True))
+        self.ask = bool(options.get("ask", True))
+        self.history, self.store = gateway.histories[session_id]
+        self.queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+        self.recognizer = gateway.models.recognizer(lang, self.rate)
+        self.monitor = RecognizerMonitor(f"session:{session_id}", self.chunk / self.rate, SILENCE_THRESHOLD)
+        self.busy = False
+        self.max_queue = 0
+        self.utterances = 0
+        self._writer = writer
+        self._send_lock = asyncio.Lock()
+        self._reply_lock = asyncio.Lock()
+        self._replies = set()
+
+        # Endpointing state - only touched by the pool thread running this session's batch
+        self._frames = []
+        self._texts = []
+        self._heard_speech = False
+        self._silence = 0.0
+        self._utterance_bytes = 0
+        self._stream_seconds = 0.0
+        self._last_partial = ""
+
+    async def send(self, event):
+        async with self._send_lock:
+            self._writer.write(encode_event(event))
+            await self._writer.drain()
+
+    async def feed(self, data):
+        """Queue one audio frame; waits (and so stops reading the socket) while the queue is full"""
+        await self.queue.put((time.perf_counter(), data))
+        depth = self.queue.qsize()
+        self.max_queue = max(self.max_queue, depth)
+        if not self.busy and depth >= BUSY_CHUNKS:
+            self.busy = True
+            tracing.inc("gateway_throttled")
+            await self.send({"event": "busy", "active": True, "queued_ms": round(depth * self.chunk / self.rate * 1000)})
+        elif self.busy and depth < BUSY_CHUNKS // 2:
+            self.busy = False
+            await self.send({"event": "busy", "active": False, "queued_ms": round(depth * self.chunk / self.rate * 1000)})
+
+    async def run(self):
+        """Recognize queued audio until the end-of-stream marker (None) arrives"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < BATCH_CHUNKS and batch[-1] is not None and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            finished = batch[-1] is None
+            items = batch[:-1] if finished else batch
+
+            if items:
+                now = time.perf_counter()
+                for arrived, _ in items:
+                    tracing.observe("gateway.queue_wait", now - arrived)
+                events = await loop.run_in_executor(self.gateway.recognizer_pool, self.recognize,
+                                                    [data for _, data in items], self.queue.qsize())
+                for event in events:
+                    await self._emit(event)
+
+            if finished:
+                event = await loop.run_in_executor(self.gateway.recognizer_pool, self.flush)
+                if event:
+                    await self._emit(event)
+                return
+
+    async def _emit(self, event):
+        pcm = event.pop("pcm", None)
+        await self.send(event)
+        if event["event"] != "final":
+            return
+        tracing.inc("gateway_utterances")
+        print(f"👤 [{self.id}] {event['text'] or '(no words)'}")
+        if self.ask and event["text"] and event["text"] not in NOISE_WORDS:
+            task = asyncio.create_task(self._reply(event["utterance"], event["text"], pcm))
+            self._replies.add(task)
+            task.add_done_callback(self._replies.discard)
+
+    def recognize(self, chunks, queue_depth):
+        """Feed a batch to the recognizer and run endpointing (pool thread); returns events"""
+        events = []
+        for data in chunks:
+            start = time.perf_counter()
+            seconds = len(data) / (2 * self.rate)
+            self._stream_seconds += seconds
+            self._frames.append(data)
+            self._utterance_bytes += len(data)
+
+            if _rms(data) >= SILENCE_THRESHOLD:
+                self._heard_speech = True
+                self._silence = 0.0
+            else:
+                self._silence += seconds
+                if not self._heard_speech and len(self._frames) > PREROLL_CHUNKS:
+                    # Nothing said yet - only keep a short preroll
+                    self._utterance_bytes -= len(self._frames.pop(0))
+
+            if not self.monitor.should_skip(data):
+                if self.recognizer.AcceptWaveform(data):
+                    text = json.loads(self.recognizer.Result()).get("text", "").strip()
+                    if text:
+                        self._texts.append(text)
+                elif self.partials and self.monitor.decode_partials:
+                    ptext = json.loads(self.recognizer.PartialResult()).get("partial", "").strip()
+                    if ptext and ptext != self._last_partial:
+                        self._last_partial = ptext
+                        events.append({"event": "partial", "text": " ".join(self._texts + [ptext]),
+                                       "stream_ms": round(self._stream_seconds * 1000)})
+
+            if self._heard_speech and (self._silence >= self.silence_duration or
+                                       self._utterance_bytes >= MAX_UTTERANCE_SECONDS * 2 * self.rate):
+                events.append(self._end_utterance())
+            self.monitor.observe(time.perf_counter() - start, queue_depth)
+        return events
+
+    def flush(self):
+        """End of stream: finish an utterance that was still in progress"""
+        return self._end_utterance() if self._heard_speech else None
+
+    def _end_utterance(self):
+        tail = json.loads(self.recognizer.FinalResult()).get("text", "").strip()
+        if tail:
+            self._texts.append(tail)
+        self.utterances += 1
+        event = {"event": "final", "utterance": self.utterances, "text": " ".join(self._texts),
+                 "stream_ms": round(self._stream_seconds * 1000), "pcm": b"".join(self._frames)}
+        self._frames = []
+        self._texts = []
+        self._heard_speech = False
+        self._silence = 0.0
+        self._utterance_bytes = 0
+        self._last_partial = ""
+        return event
+
+    async def _reply(self, utterance, text, pcm):
+        # One reply at a time per session so the conversation history stays in order
+        async with self._reply_lock:
+            loop = asyncio.get_running_loop()
+            transcription, answer = await loop.run_in_executor(self.gateway.io_pool, self._ask, text, pcm)
+            if answer:
+                print(f"🤖 [{self.id}] {answer}")
+                await self.send({"event": "reply", "utterance": utterance,
+                                 "transcription": transcription, "text": answer})
+
+    def _ask(self, text, pcm):
+        """Cloud transcription (falling back to Vosk) then /api/ask with this session's history"""
+        transcription = text
+        conditioned, _ = condition_audio(pcm, self.rate)
+        if conditioned is not None:
+            buf = io.BytesIO()
+            with wave.open(buf, 'wb') as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(self.rate)
+                wf.writeframes(conditioned)
+            try:
+                with tracing.span("gateway.transcribe"):
+                    r = api_client.post("/api/transcribe-groq", timeout=20, json={
+                        "audio": base64.b64encode(buf.getvalue()).decode("utf-8"), "language": self.lang})
+                r.raise_for_status()
+                transcription = r.json().get("transcription", "").strip() or text
+            except requests.exceptions.RequestException:
+                pass
+
+        try:
+            with tracing.span("gateway.ask"):
+                r = api_client.post("/api/ask", timeout=40, json={
+                    "text": transcription,
+                    "context": {},
+                    "conversationHistory": list(self.history),
+                    "responseLanguage": self.lang,
+                })
+            r.raise_for_status()
+            resp_data = r.json()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            return transcription, OFFLINE_REPLY
+        except requests.exceptions.RequestException as e:
+            print(f"❌ [{self.id}] API error: {e}")
+            return transcription, None
+
+        self.history[:] = resp_data.get("conversationHistory", self.history)
+        answer = resp_data.get("response", "No response.")
+        if self.store:
+            self.store.append([{"role": "user", "content": transcription},
+                               {"role": "assistant", "content": answer}], lang=self.lang)
+        return transcription, answer
+
+    async def finish(self):
+        """Wait for replies still in flight"""
+        if self._replies:
+            await asyncio.gather(*self._replies, return_exceptions=True)
+
+    def stats(self):
+        return {"event": "stats", "session": self.id, "lang": self.lang, "utterances": self.utterances,
+                "rtf": round(self.monitor.rtf, 3), "peak_rtf": round(self.monitor.peak_rtf, 3),
+                "chunks": self.monitor.chunks, "skipped": self.monitor.skipped,
+                "max_queue": self.max_queue}
+
+
+# ────────────────────────────────────────────────
+# GATEWAY
+# ────────────────────────────────────────────────
+
+class Gateway:
+    """Accepts client connections and runs one Session per connection"""
+
+    def __init__(self, models, workers=None, io_workers=16, max_sessions=MAX_SESSIONS, history_dir=None):
+        self.models = models
+        self.max_sessions = max_sessions
+        self.history_dir = history_dir
+        self.workers = workers or os.cpu_count()
+        self.recognizer_pool = ThreadPoolExecutor(self.workers, thread_name_prefix="atlas-recognizer")
+        self.io_pool = ThreadPoolExecutor(io_workers, thread_name_prefix="atlas-gateway-io")
+        self.sessions = {}    # session id → Session, or None while it is still being set up
+        self.histories = {}   # session id → (conversation history, store), kept across reconnects
+        self._idle = OrderedDict()  # session id → when it disconnected, oldest first
+
+    def _open_history(self, session_id):
+        """(resumed history, store) for a session - from disk when a history dir is set"""
+        if not self.history_dir:
+            return [], None
+        store = HistoryStore(os.path.join(self.history_dir, re.sub(r"[^\w.-]", "_", session_id)))
+        return store.load_recent(RESUME_TURNS), store
+
+    def _release_history(self, session_id, named):
+        """Keep a named session's history for a reconnect; drop anonymous ones at once"""
+        if named:
+            self._idle[session_id] = time.monotonic()
+        else:
+            self._drop_history(session_id)
+        now = time.monotonic()
+        while self._idle:
+            oldest, since = next(iter(self._idle.items()))
+            if now - since < HISTORY_IDLE_SECONDS and len(self._idle) <= MAX_IDLE_HISTORIES:
+                break
+            del self._idle[oldest]
+            self._drop_history(oldest)
+
+    def _drop_history(self, session_id):
+        _, store = self.histories.pop(session_id, (None, None))
+        if store:
+            self.io_pool.submit(store.close)  # flushes queued turns and closes the segment file
+        tracing.set_gauge("gateway_histories", len(self.histories))
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        session = None
+        worker = None
+        reserved = None
+        try:
+            kind, payload = await asyncio.wait_for(read_frame(reader, MAX_FRAME_BYTES), HELLO_TIMEOUT)
+            if kind != HELLO:
+                raise ProtocolError("expected a hello frame first")
+            options = parse_hello(payload)
+            named = bool(options.get("session"))
+            session_id = str(options.get("session") or uuid.uuid4().hex[:8])
+
+            if len(self.sessions) >= self.max_sessions:
+                tracing.inc("gateway_rejected", reason="full")
+                writer.write(encode_event({"event": "error", "message": "gateway full"}))
+                return
+            if session_id in self.sessions:
+                tracing.inc("gateway_rejected", reason="duplicate")
+                writer.write(encode_event({"event": "error", "message": f"session {session_id} already connected"}))
+                return
+            # Claim the slot and id before the first await, so concurrent hellos see it
+            self.sessions[session_id] = None
+            reserved = session_id
+
+            lang = options.get("lang") or self.models.languages[0]
+            if lang not in self.models.languages:
+                raise ProtocolError(f"no model for language '{lang}' (have {', '.join(self.models.languages)})")
+            # A language's first session loads its model - keep that (and disk) off the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.io_pool, self.models.get, lang)
+            self._idle.pop(session_id, None)
+            if session_id not in self.histories:
+                self.histories[session_id] = await loop.run_in_executor(self.io_pool, self._open_history, session_id)
+                tracing.set_gauge("gateway_histories", len(self.histories))
+
+            session = Session(self, session_id, lang, writer, options)
+            self.sessions[session_id] = session
+            tracing.set_gauge("gateway_sessions", len(self.sessions))
+            print(f"🔌 [{session_id}] connected from {peer[0] if peer else '?'}, {lang} ({len(self.sessions)} active)")
+            await session.send({"event": "ready", "session": session_id})
+            worker = asyncio.create_task(session.run())
+
+            while True:
+                kind, payload = await read_frame(reader, MAX_FRAME_BYTES)
+                if kind == AUDIO:
+                    if payload:
+                        await session.feed(payload)
+                elif kind in (END, None):
+                    break
+                else:
+                    raise ProtocolError(f"unexpected frame type {kind!r}")
+
+            await session.queue.put(None)
+            await worker
+            await session.finish()
+            await session.send(session.stats())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # client went away mid-frame
+        except (ProtocolError, ValueError, asyncio.TimeoutError) as e:
+            try:
+                writer.write(encode_event({"event": "error", "message": str(e) or "timed out waiting for hello"}))
+            except Exception:
+                pass
+        finally:
+            if worker and not worker.done():
+                worker.cancel()
+            if reserved:
+                self.sessions.pop(reserved, None)
+                tracing.set_gauge("gateway_sessions", len(self.sessions))
+            if session:
+                print(f"👋 [{session.id}] disconnected ({session.monitor.summary()}, "
+                      f"max queue {session.max_queue}, {len(self.sessions)} active)")
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+            if session:
+                # Replies still in flight write to the history, so let them land first
+                await asyncio.gather(session.finish(), return_exceptions=True)
+            if reserved in self.histories and reserved not in self.sessions:
+                self._release_history(reserved, named)
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🛰️ ATLAS gateway listening on {host}:{server.sockets[0].getsockname()[1]} "
+              f"({self.workers} recognizer threads, max {self.max_sessions} sessions)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many ATLAS audio streams from one shared Vosk model")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--model", help="English Vosk model directory (defaults to .env)")
+    parser.add_argument("--preload", action="store_true", help="load every language's model at startup")
+    parser.add_argument("--workers", type=int, help="recognizer threads (default: CPU count)")
+    parser.add_argument("--io-workers", type=int, default=16, help="threads for API calls")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--history-dir", help="persist each session's conversation under this directory")
+    args = parser.parse_args()
+
+    models = ModelRegistry(model_paths(args.model))
+    if not models.languages:
+        raise SystemExit("ERROR: No valid Vosk model found. Pass --model or set VOSK_MODEL_PATH_EN/VOSK_MODEL_PATH_EL in .env")
+
+    from vosk import SetLogLevel
+    SetLogLevel(-1)
+    tracing.configure()
+    api_client.start_health_monitor(["/api/transcribe-groq", "/api/ask"])
+
+    # The default language loads up front; others on their first session unless --preload
+    print(f"Vosk models: {', '.join(f'{lang}={path}' for lang, path in models.paths.items())}")
+    for lang in models.languages if args.preload else models.languages[:1]:
+        models.get(lang)
+    gateway = Gateway(models, args.workers, args.io_workers, args.max_sessions, args.history_dir)
+    try:
+        asyncio.run(gateway.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Gateway shutting down.")
+
+
+if __name__ == "__main__":
+    main()
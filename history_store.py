@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# history_store.py - Append-only on-disk conversation log with fast resume of the last N turns
+#
+# Turns are appended as JSON lines to numbered segment files in one directory:
+#   history/00000001.jsonl  {"turn": 1, "ts": ..., "messages": [{"role": "user", ...}, ...]}
+#                           {"turn": 7, "ts": ..., "reset": true}
+# Writes go through one background thread, so append() never waits on the
+# disk. Resume reads segments newest-first and stops after N turns or at a
+# reset marker, so startup cost depends on N, not on how long history is.
+
+import json
+import os
+import queue
+import threading
+import time
+import tracing
+
+# ────────────────────────────────────────────────
+# CONFIG
+# ────────────────────────────────────────────────
+
+SEGMENT_BYTES = 256 * 1024       # rotate to a new segment file past this size
+RETENTION_DAYS = 90              # sealed segments older than this are deleted
+MAX_BYTES = 64 * 1024 * 1024     # ...as are the oldest ones while history is bigger than this
+
+_SUFFIX = ".jsonl"
+
+# ────────────────────────────────────────────────
+# BACKGROUND WRITER
+# ────────────────────────────────────────────────
+# One thread serves every store in the process (the gateway has one per session).
+
+_write_queue = queue.Queue()
+_writer_started = False
+_writer_lock = threading.Lock()
+
+
+def _writer_loop():
+    dirty = set()
+    while True:
+        store, record = _write_queue.get()
+        try:
+            store._write(record)
+            dirty.add(store)
+            # Sync once the burst of queued records has been written
+            if _write_queue.empty():
+                for s in dirty:
+                    s._sync()
+                dirty.clear()
+        except Exception as e:
+            print(f"❌ [History] Write failed: {e}")
+        finally:
+            _write_queue.task_done()
+
+
+def _start_writer():
+    global _writer_started
+    with _writer_lock:
+        if not _writer_started:
+            _writer_started = True
+            threading.Thread(target=_writer_loop, daemon=True, name="atlas-history-writer").start()
+
+
+def flush():
+    """Block until everything appended so far is on disk"""
+    _write_queue.join()
+
+
+class HistoryStore:
+    """Conversation history for one assistant (or one gateway session) in a directory"""
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, retention_days=RETENTION_DAYS, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        # Writer state - only touched by the writer thread after construction
+        self._fh = None
+        self._has_reset = False
+        segments = self._segments()
+        self._active = segments[-1] if segments else 1
+        self._active_bytes = self._size(self._active)
+        if self._active_bytes >= segment_bytes:
+            self._active += 1
+            self._active_bytes = 0
+
+        last = self._read(segments[-1]) if segments else []
+        self._next_turn = last[-1]["turn"] + 1 if last else 1
+
+    # ── paths ──
+
+    def _path(self, index):
+        return os.path.join(self.directory, f"{index:08d}{_SUFFIX}")
+
+    def _segments(self):
+        return sorted(int(name[:-len(_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(_SUFFIX) and name[:-len(_SUFFIX)].isdigit())
+
+    def _size(self, index):
+        try:
+            return os.path.getsize(self._path(index))
+        except OSError:
+            return 0
+
+    def _ends_with_newline(self, index):
+        with open(self._path(index), "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _read(self, index):
+        """Records of one segment; a torn last line from a crash is skipped"""
+        records = []
+        try:
+            with open(self._path(index), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return records
+
+    # ── reading ──
+
+    def load_recent(self, n):
+        """Flattened messages of the last n turns since the latest reset"""
+        turns = []
+        newest_seen = None
+        with tracing.span("history.load", turns=n):
+            for index in reversed(self._segments()):
+                for record in reversed(self._read(index)):
+                    # Compaction can leave a record in two segments for a moment after a crash
+                    if newest_seen is not None and record.get("turn", 0) >= newest_seen:
+                        continue
+                    newest_seen = record.get("turn", 0)
+                    if record.get("reset"):
+                        return [m for turn in reversed(turns) for m in turn]
+                    turns.append(record.get("messages", []))
+                    if len(turns) >= n:
+                        return [m for turn in reversed(turns) for m in turn]
+        return [m for turn in reversed(turns) for m in turn]
+
+    # ── writing (queued) ──
+
+    def append(self, messages, **meta):
+        """Queue one turn's messages for writing; returns immediately"""
+        self._enqueue({"messages": messages, **meta})
+
+    def reset(self):
+        """Start a fresh conversation: resume stops here and compaction drops what came before"""
+        self._enqueue({"reset": True})
+
+    def _enqueue(self, record):
+        record = {"turn": self._next_turn, "ts": round(time.time(), 3), **record}
+        self._next_turn += 1
+        _start_writer()
+        _write_queue.put((self, record))
+
+    def _write(self, record):
+        if self._fh is None:
+            self._fh = open(self._path(self._active), "a", encoding="utf-8")
+            if self._fh.tell() and not self._ends_with_newline(self._active):
+                self._fh.write("\n")  # don't glue this record onto a line torn by a crash
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self._fh.write(line)
+        self._active_bytes += len(line.encode("utf-8"))
+        self._has_reset = self._has_reset or bool(record.get("reset"))
+        if self._active_bytes >= self.segment_bytes:
+            self._rotate()
+
+    def _sync(self):
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def _rotate(self):
+        self._sync()
+        self._fh.close()
+        self._fh = None
+        sealed, had_reset = self._active, self._has_reset
+        self._active += 1
+        self._active_bytes = 0
+        self._has_reset = False
+        tracing.inc("history_rotations")
+        if had_reset:
+            self._compact(sealed)
+        self._apply_retention()
+
+    # ── maintenance (writer thread) ──
+
+    def _compact(self, index):
+        """Drop everything before the last reset in sealed segment `index`"""
+        with tracing.span("history.compact"):
+            records = self._read(index)
+            resets = [i for i, r in enumerate(records) if r.get("reset")]
+            if not resets:
+                return
+            last_reset = resets[-1]
+            for older in self._segments():
+                if older < index:
+                    os.remove(self._path(older))
+            tmp = self._path(index) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for record in records[last_reset:]:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._path(index))
+
+    def _apply_retention(self):
+        sealed = [i for i in self._segments() if i < self._active]
+        cutoff = time.time() - self.retention_days * 86400
+        total = sum(self._size(i) for i in sealed) + self._active_bytes
+        for index in sealed:
+            path = self._path(index)
+            if os.path.getmtime(path) >= cutoff and total <= self.max_bytes:
+                break
+            total -= self._size(index)
+            os.remove(path)
+            tracing.inc("history_segments_expired")
+
+    def close(self):
+        """Flush queued turns and close the active segment"""
+        flush()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
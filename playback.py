@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# playback.py - Non-blocking, interruptible TTS playback with barge-in detection
+
+import json
+import os
+import queue
+import re
+import threading
+import numpy as np
+
+# ────────────────────────────────────────────────
+# CONFIG
+# ────────────────────────────────────────────────
+
+BARGE_IN_THRESHOLD = 1500     # RMS a frame must exceed while ATLAS is talking - only safe with
+                              # a headset or echo cancellation, speakers alone will exceed it
+BARGE_IN_MS = 64              # sustained speech needed before playback is cut
+BARGE_IN_FRAME_MS = 16        # analysis frame size; checked frame by frame, not per chunk
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_sentences(text):
+    """Split a reply into sentences so the first can play while the rest synthesize"""
+    parts = [p.strip() for p in _SENTENCE_END.split(text or "") if p.strip()]
+    return parts or [text]
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Speaker:
+    """Synthesizes and plays text on background threads.
+
+    say() queues sentences and returns immediately; a synthesis thread renders
+    them in order while a playback thread plays whatever is ready. interrupt()
+    stops the current sentence at once and drops everything still queued.
+    Completion and interruption are signalled through events, never polled.
+    Audio goes to a sink from audio_io (speakers by default).
+    """
+
+    def __init__(self, synthesize, sink=None, fallback=None):
+        self._synthesize = synthesize
+        self._sink = sink
+        self._fallback = fallback
+        self._text_queue = queue.Queue()
+        self._audio_queue = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._playing = False
+        self._interrupt = threading.Event()
+        self.done = threading.Event()
+        self.done.set()
+        self.interrupted = False
+        self._pending = 0
+
+        threading.Thread(target=self._synth_loop, daemon=True, name="atlas-tts-synth").start()
+        threading.Thread(target=self._play_loop, daemon=True, name="atlas-tts-play").start()
+
+    def say(self, text, audio_file=None):
+        """Queue text for playback. audio_file plays pre-synthesized speech as-is."""
+        with self._lock:
+            generation = self._generation
+            self.interrupted = False
+            self._interrupt.clear()
+            self.done.clear()
+            if audio_file is not None:
+                self._pending += 1
+                self._audio_queue.put((generation, audio_file, text))
+                return
+            sentences = split_sentences(text)
+            self._pending += len(sentences)
+        for sentence in sentences:
+            self._text_queue.put((generation, sentence))
+
+    def interrupt(self):
+        """Stop playback now and drop the rest of the queued speech"""
+        with self._lock:
+            if self.done.is_set():
+                return
+            self._generation += 1
+            self.interrupted = True
+            self._interrupt.set()
+            if self._playing:
+                self._sink.stop()
+            self._pending = 0
+            self._drain(self._text_queue)
+            for _, audio_file, _ in self._drain(self._audio_queue):
+                if audio_file:
+                    _remove(audio_file)
+            self.done.set()
+
+    def wait(self, timeout=None):
+        """Block until playback finishes or is interrupted. True if it finished."""
+        self.done.wait(timeout)
+        return not self.interrupted
+
+    @staticmethod
+    def _drain(q):
+        items = []
+        while True:
+            try:
+                items.append(q.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _stale(self, generation):
+        return generation != self._generation
+
+    def _finish_one(self, generation):
+        with self._lock:
+            if self._stale(generation):
+                return
+            self._pending -= 1
+            if self._pending <= 0:
+                self._pending = 0
+                self.done.set()
+
+    def _synth_loop(self):
+        while True:
+            generation, sentence = self._text_queue.get()
+            if self._stale(generation):
+                continue
+            try:
+                audio_file = self._synthesize(sentence)
+            except Exception as e:
+                # Let the playback thread speak it through the fallback, in order
+                print(f"[TTS] Synthesis failed: {e}")
+                audio_file = None
+            if self._stale(generation):
+                if audio_file:
+                    _remove(audio_file)
+                continue
+            self._audio_queue.put((generation, audio_file, sentence))
+
+    def _play_loop(self):
+        while True:
+            generation, audio_file, text = self._audio_queue.get()
+            try:
+                if self._stale(generation):
+                    continue
+                if audio_file is None:
+                    if self._fallback:
+                        self._fallback(text)
+                    continue
+                with self._lock:
+                    if self._stale(generation):
+                        continue
+                    duration = self._sink.play(audio_file)
+                    self._playing = True
+                # Sleep until the sentence ends or interrupt() fires - no polling
+                self._interrupt.wait(duration)
+            except Exception as e:
+                print(f"[TTS] Playback failed: {e}")
+            finally:
+                with self._lock:
+                    self._playing = False
+                if audio_file:
+                    _remove(audio_file)
+                self._finish_one(generation)
+
+
+class BargeInListener:
+    """Watches a capture subscription while ATLAS is talking.
+
+    Fires on_barge_in() when sustained speech or a stop phrase is heard and
+    then stops consuming its subscription, so handoff() can pass the onset
+    audio plus everything captured since to the recorder without a gap.
+    Stop phrases that occur in spoken_text (what ATLAS is saying right now)
+    are ignored, so ATLAS can't put itself to sleep by saying "goodbye".
+    """
+
+    def __init__(self, capture, on_barge_in, recognizer=None, stop_phrases=(), spoken_text=""):
+        self.capture = capture
+        self.on_barge_in = on_barge_in
+        self.recognizer = recognizer
+        spoken = (spoken_text or "").lower()
+        self.stop_phrases = [p.lower() for p in stop_phrases if p.lower() not in spoken]
+        self.triggered = threading.Event()
+        self.stop_phrase = None
+        self.preroll = []
+        self._queue = None
+        self._thread = None
+        self._closed = threading.Event()
+
+    def start(self):
+        self._queue = self.capture.subscribe()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="atlas-barge-in")
+        self._thread.start()
+        return self
+
+    def handoff(self):
+        """Stop listening. Returns (preroll, subscription, stop_phrase) after a
+        barge-in - the subscription stays live for the recorder - else None."""
+        if self.triggered.is_set():
+            self._thread.join(timeout=1.0)
+            return self.preroll, self._queue, self.stop_phrase
+
+        self._closed.set()
+        self.capture.unsubscribe(self._queue)
+        try:
+            self._queue.put_nowait(b"")
+        except queue.Full:
+            pass
+        self._thread.join(timeout=1.0)
+        # It may have fired while we were shutting down
+        if self.triggered.is_set():
+            return self.preroll, self.capture.subscribe(), self.stop_phrase
+        return None
+
+    def _trigger(self):
+        if not self.triggered.is_set():
+            self.triggered.set()
+            self.on_barge_in()
+
+    def _run(self):
+        frame_len = int(self.capture.rate * BARGE_IN_FRAME_MS / 1000)
+        needed = max(1, BARGE_IN_MS // BARGE_IN_FRAME_MS)
+        loud_run = 0
+        recent = []
+
+        while not self._closed.is_set():
+            data = self._queue.get()
+            if not data or self._closed.is_set():
+                break
+
+            recent = (recent + [data])[-4:]
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float64)
+            speech = False
+            for start in range(0, len(samples) - frame_len + 1, frame_len):
+                frame = samples[start:start + frame_len]
+                if np.sqrt(np.mean(frame * frame)) > BARGE_IN_THRESHOLD:
+                    loud_run += 1
+                    if loud_run >= needed:
+                        speech = True
+                        break  # cut now, the rest of the chunk doesn't matter
+                else:
+                    loud_run = 0
+
+            if not speech and self.recognizer is not None:
+                if self.recognizer.AcceptWaveform(data):
+                    text = json.loads(self.recognizer.Result()).get("text", "")
+                else:
+                    text = json.loads(self.recognizer.PartialResult()).get("partial", "")
+                text = text.strip().lower()
+                for phrase in self.stop_phrases:
+                    if phrase in text:
+                        self.stop_phrase = phrase
+                        break
+
+            if self.stop_phrase or speech:
+                self.preroll = list(recent)
+                self._trigger()
+                break
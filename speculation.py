@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# speculation.py - Start downstream work from the local Vosk transcript while the cloud transcript is in flight
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Words the two recognizers disagree on without changing what was asked
+FILLER_WORDS = {"a", "an", "the", "please", "uh", "um", "er"}
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="atlas-speculate")
+
+# Running totals across the session
+speculation_stats = {
+    "attempts": 0,
+    "hits": 0,
+    "misses": 0,
+    "latency_saved": 0.0,   # seconds of work that overlapped the cloud transcription
+}
+_stats_lock = threading.Lock()
+
+
+def normalize_transcript(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = re.sub(r"[^\w\s']", " ", (text or "").lower())
+    return " ".join(text.split())
+
+
+def transcript_key(text):
+    """What must agree for speculative work to be reused: the words, minus fillers.
+
+    Deliberately not a similarity ratio - "play hello" / "play yellow" and
+    "turn on the lights" / "turn off the lights" are one letter apart.
+    """
+    return " ".join(w for w in normalize_transcript(text).split() if w not in FILLER_WORDS)
+
+
+def transcripts_match(local_text, transcription, key=transcript_key):
+    """True when the local transcript asks for the same thing as the authoritative one"""
+    a = key(local_text)
+    return bool(a) and a == key(transcription)
+
+
+def hit_rate():
+    """Fraction of resolved speculations that were committed"""
+    with _stats_lock:
+        resolved = speculation_stats["hits"] + speculation_stats["misses"]
+        return speculation_stats["hits"] / resolved if resolved else 0.0
+
+
+def stats_summary():
+    with _stats_lock:
+        hits = speculation_stats["hits"]
+        resolved = hits + speculation_stats["misses"]
+        saved = speculation_stats["latency_saved"]
+    rate = 100.0 * hits / resolved if resolved else 0.0
+    return f"hit rate {rate:.0f}% ({hits}/{resolved}), saved {saved:.2f}s total"
+
+
+class Speculation:
+    """A bundle of speculative tasks started from one local transcript.
+
+    Tasks run on a shared thread pool. resolve() compares the local transcript
+    with the authoritative one through `key` and either commits the work
+    (results become available through result()) or cancels it and discards
+    anything already produced. Cancelling after a commit drops only the
+    results the caller never took.
+    """
+
+    def __init__(self, local_text, key=transcript_key):
+        self.local_text = local_text or ""
+        self.key = key
+        self.started = time.time()
+        self.resolved_at = None
+        self.committed = False
+        self._cancelled = threading.Event()
+        self._tasks = {}
+
+    def __bool__(self):
+        return bool(self._tasks)
+
+    def submit(self, name, fn, *args, on_discard=None):
+        """Start fn(*args) in the background under the given name.
+
+        on_discard(result) is called if the speculation is cancelled, e.g. to
+        delete a pre-synthesized audio file.
+        """
+        task = {"started": time.time(), "finished": None, "on_discard": on_discard, "used": False}
+
+        def run():
+            if self._cancelled.is_set():
+                return None
+            try:
+                return fn(*args)
+            finally:
+                task["finished"] = time.time()
+
+        task["future"] = _executor.submit(run)
+        self._tasks[name] = task
+        return task["future"]
+
+    def resolve(self, transcription):
+        """Commit if the authoritative transcription matches, otherwise cancel.
+        Returns True on commit."""
+        if not self._tasks:
+            return False
+
+        self.resolved_at = time.time()
+        self.committed = transcripts_match(self.local_text, transcription, self.key)
+
+        with _stats_lock:
+            speculation_stats["attempts"] += 1
+            if self.committed:
+                speculation_stats["hits"] += 1
+                speculation_stats["latency_saved"] += self._overlap()
+            else:
+                speculation_stats["misses"] += 1
+
+        if not self.committed:
+            self.cancel()
+        return self.committed
+
+    def result(self, name, timeout=None):
+        """Result of a committed task, or None if missing, cancelled or failed"""
+        task = self._tasks.get(name)
+        if not self.committed or task is None:
+            return None
+        try:
+            result = task["future"].result(timeout=timeout)
+        except Exception as e:
+            print(f"[Speculate] '{name}' failed: {e}")
+            return None
+        # From here on the caller owns the result (and its audio file)
+        task["used"] = result is not None
+        return result
+
+    def cancel(self):
+        """Cancel pending work and discard anything produced but not handed out by result()"""
+        if self._cancelled.is_set():
+            return
+        self._cancelled.set()
+        for task in self._tasks.values():
+            if task["used"]:
+                continue
+            future = task["future"]
+            if future.cancel():
+                continue
+            on_discard = task["on_discard"]
+            if on_discard:
+                future.add_done_callback(lambda f, cb=on_discard: _discard(f, cb))
+
+    def _overlap(self):
+        """Seconds of speculative work done before the authoritative transcript arrived"""
+        saved = 0.0
+        for task in self._tasks.values():
+            end = task["finished"] or self.resolved_at
+            saved = max(saved, min(end, self.resolved_at) - task["started"])
+        return max(saved, 0.0)
+
+
+def _discard(future, on_discard):
+    try:
+        result = future.result()
+    except Exception:
+        return
+    if result is not None:
+        try:
+            on_discard(result)
+        except Exception:
+            pass
@@ -2,6 +2,7 @@ import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 import os
 from dotenv import load_dotenv
+from tracing import traced
 
 load_dotenv()
 
@@ -21,6 +22,7 @@ sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
     cache_path=".spotify_cache"
 ))
    
+@traced("spotify.current_track")
 def get_current_track():
     """Get currently playing track info"""
     try:
@@ -38,29 +40,42 @@ def get_current_track():
     except Exception as e:
         return f"Error getting current track: {str(e)}"
 
-def search_and_play(query):
-    try:
-        results = sp.search(q=query, limit=1, type="track")
+@traced("spotify.search")
+def search_track(query):
+    """Find the best matching track without touching playback (safe to speculate on)"""
+    results = sp.search(q=query, limit=1, type="track")
 
-        # Fix: Correct the key from 'track' to 'tracks'
-        if not results['tracks']['items']:
-            return f"Couldn't find '{query}'"
-        
-        track = results['tracks']['items'][0]
-        track_name = track['name']
-        artist_name = track['artists'][0]['name']
+    # Fix: Correct the key from 'track' to 'tracks'
+    if not results['tracks']['items']:
+        return None
+
+    return results['tracks']['items'][0]
 
-        # Start playback
+@traced("spotify.play")
+def play_track(track):
+    """Start playback of a track returned by search_track()"""
+    try:
         sp.start_playback(uris=[track['uri']])
+        return f"Playing {track['name']} by {track['artists'][0]['name']}"
 
-        return f"Playing {track_name} by {artist_name}"
-    
     except Exception as e:
-        error_msg = str(e) 
+        error_msg = str(e)
         if "NO_ACTIVE_DEVICE" in error_msg:
             return "No active Spotify device found. Please open Spotify on your phone or computer first."
         return f"Error playing music: {error_msg}"
 
+def search_and_play(query):
+    try:
+        track = search_track(query)
+    except Exception as e:
+        return f"Error playing music: {str(e)}"
+
+    if not track:
+        return f"Couldn't find '{query}'"
+
+    return play_track(track)
+
+@traced("spotify.play_pause")
 def play_pause():
     """Toggle play/pause"""
     try:
@@ -79,6 +94,7 @@ def play_pause():
     except Exception as e:
         return f"Error: {str(e)}"
     
+@traced("spotify.next")
 def next_track():
     """Skip to next track"""
     try:
@@ -92,6 +108,7 @@ def next_track():
     except Exception as e:
         return f"Error skipping tracks: {str(e)}"
 
+@traced("spotify.previous")
 def previous_track():
     """Go to previous track"""
     try:
@@ -105,6 +122,7 @@ def previous_track():
     except Exception as e:
         return f"Error going back: {str(e)}"
 
+@traced("spotify.volume")
 def set_volume(volume_percent):
     """Set volume (0-100)"""
 
@@ -115,6 +133,7 @@ def set_volume(volume_percent):
     except Exception as e:
         return f"Error setting volume: {str(e)}"
 
+@traced("spotify.playlist")
 def play_playlist(playlist_name):
     """Play a playlist by name"""
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# system_commands.py - Open websites, run searches and launch apps from the client itself
+#
+# Commands are parsed against precompiled alias tables and launched on a small
+# thread pool, so the caller can speak its confirmation straight away. Each
+# launch is tracked (launches / summary()) and its outcome logged when done.
+# remote=True sends the command to the server's /api/system-commands instead.
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import webbrowser
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
+import api_client
+import tracing
+
+# ────────────────────────────────────────────────
+# ALIAS TABLES
+# ────────────────────────────────────────────────
+
+# "open youtube" works without saying "open website"
+SITES = {
+    "youtube": "https://youtube.com",
+    "google": "https://google.com",
+    "netflix": "https://netflix.com",
+    "facebook": "https://facebook.com",
+    "twitter": "https://twitter.com",
+    "reddit": "https://reddit.com",
+    "instagram": "https://instagram.com",
+    "gmail": "https://gmail.com",
+    "spotify": "https://open.spotify.com",
+    "amazon": "https://amazon.com",
+    "github": "https://github.com",
+}
+
+# Spoken app name → what to launch (Windows names; resolved through PATH elsewhere)
+APPS = {
+    "calculator": "calc",
+    "notepad": "notepad",
+    "paint": "mspaint",
+    "file explorer": "explorer",
+    "explorer": "explorer",
+    "command prompt": "cmd",
+    "terminal": "wt",
+    "task manager": "taskmgr",
+    "settings": "ms-settings:",
+    "chrome": "chrome",
+    "google chrome": "chrome",
+    "edge": "msedge",
+    "microsoft edge": "msedge",
+    "firefox": "firefox",
+    "word": "winword",
+    "excel": "excel",
+    "powerpoint": "powerpnt",
+    "vs code": "code",
+    "visual studio code": "code",
+    "discord": "discord",
+    "steam": "steam",
+}
+
+# Sites that "open X" / "launch X" must not treat as an app
+SKIP_APPS = {"youtube", "google", "netflix", "facebook"}
+
+
+def _alternation(names):
+    # Longest first so "visual studio code" wins over "code"
+    return "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+
+
+_WEBSITE_RE = re.compile(r"(?:open website|go to)\s*(.*)")
+_KNOWN_APP_RE = re.compile(rf"(?:open|launch) (?:the |my )?({_alternation(APPS)})\b")
+_SITE_RE = re.compile(rf"open ({_alternation(SITES)})\b")
+_SEARCH_RE = re.compile(r"(?:search for|google search|search)\s*(.*)")
+_APP_RE = re.compile(r"(?:open|launch) (.*)")
+_APP_FILLER_RE = re.compile(r"^(?:the|my)\s+|\b(?:app|application)\b")
+
+SystemCommand = namedtuple("SystemCommand", "action parameter reply")
+
+
+def parse(transcription):
+    """Turn a transcript into a SystemCommand, or None if it isn't one"""
+    text_lower = transcription.lower()
+
+    # DYNAMIC: Open any website
+    m = _WEBSITE_RE.search(text_lower)
+    if m:
+        site = m.group(1).strip()
+        if "." not in site:
+            site = f"{site}.com"
+        if not site.startswith("http"):
+            site = f"https://{site}"
+        return SystemCommand("open-url", site, f"Opening {site}")
+
+    # SHORTCUT: Known apps - before sites, so "google chrome" isn't google.com
+    m = _KNOWN_APP_RE.search(text_lower)
+    if m:
+        return SystemCommand("open-app", m.group(1), f"Opening {m.group(1)}")
+
+    # SHORTCUT: Common websites
+    m = _SITE_RE.search(text_lower)
+    if m:
+        return SystemCommand("open-url", SITES[m.group(1)], f"Opening {m.group(1)}")
+
+    # DYNAMIC: Search Google
+    m = _SEARCH_RE.search(text_lower)
+    if m:
+        query = m.group(1).strip()
+        if query:
+            return SystemCommand("search-google", query, f"Searching for {query}")
+
+    # DYNAMIC: Open any application
+    m = _APP_RE.search(text_lower)
+    if m:
+        app = _APP_FILLER_RE.sub("", m.group(1)).strip()
+        if app in SKIP_APPS or "playlist" in app:
+            return None
+        return SystemCommand("open-app", app, f"Opening {app}")
+
+    return None
+
+
+# ────────────────────────────────────────────────
+# LOCAL LAUNCHERS
+# ────────────────────────────────────────────────
+
+def open_url(url):
+    if not webbrowser.open(url):
+        raise RuntimeError("no web browser available")
+
+
+def search_google(query):
+    open_url(f"https://google.com/search?q={quote_plus(query)}")
+
+
+def open_app(app):
+    """Start an app without waiting for it (or a shell) to finish"""
+    target = APPS.get(app, app)
+    if sys.platform == "win32":
+        os.startfile(target)  # ShellExecute: PATH, App Paths and ms-settings: URIs
+        return
+    if sys.platform == "darwin":
+        cmd = ["open", "-a", target]
+    else:
+        exe = shutil.which(target) or shutil.which(target.replace(" ", "-"))
+        if not exe:
+            raise FileNotFoundError(f"'{target}' is not installed")
+        cmd = [exe]
+    subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+_LAUNCHERS = {
+    "open-url": open_url,
+    "search-google": search_google,
+    "open-app": open_app,
+}
+
+
+def _remote(action, parameter):
+    r = api_client.post("/api/system-commands", json={"action": action, "parameter": parameter}, timeout=5)
+    r.raise_for_status()
+
+
+# ────────────────────────────────────────────────
+# FIRE-AND-FORGET EXECUTOR
+# ────────────────────────────────────────────────
+
+LAUNCH_WORKERS = 4
+MAX_TRACKED = 50
+
+_pool = ThreadPoolExecutor(LAUNCH_WORKERS, thread_name_prefix="atlas-launch")
+_lock = threading.Lock()
+launches = deque(maxlen=MAX_TRACKED)   # most recent launches, newest last
+launch_stats = {"ok": 0, "failed": 0}
+
+
+class Launch:
+    """Outcome of one background launch; status is pending, ok or failed"""
+
+    def __init__(self, command, remote):
+        self.command = command
+        self.remote = remote
+        self.status = "pending"
+        self.error = None
+        self.seconds = None
+        self.future = None
+
+    def wait(self, timeout=None):
+        """Block until the launch finished; True if it succeeded"""
+        self.future.result(timeout)
+        return self.status == "ok"
+
+
+def _run(record):
+    action, parameter = record.command.action, record.command.parameter
+    start = time.perf_counter()
+    try:
+        if record.remote:
+            _remote(action, parameter)
+        else:
+            _LAUNCHERS[action](parameter)
+        record.status = "ok"
+    except Exception as e:
+        record.status = "failed"
+        record.error = str(e) or type(e).__name__
+    record.seconds = time.perf_counter() - start
+
+    with _lock:
+        launch_stats[record.status] += 1
+    tracing.observe("system.launch", record.seconds)
+    tracing.inc("system_commands", action=action, result=record.status)
+    if record.status == "ok":
+        print(f"✅ [System] {action} {parameter} ({record.seconds * 1000:.0f} ms)")
+    else:
+        print(f"❌ [System] {action} {parameter} failed: {record.error}")
+
+
+def launch(command, remote=False):
+    """Start a SystemCommand in the background and return its Launch at once"""
+    record = Launch(command, remote)
+    with _lock:
+        launches.append(record)
+    record.future = _pool.submit(_run, record)
+    return record
+
+
+def summary():
+    with _lock:
+        return f"{launch_stats['ok']} launched, {launch_stats['failed']} failed"
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# tracing.py - Lightweight spans, latency histograms and counters for the voice client
+#
+# Disabled by default. Enable with:
+#   ATLAS_TRACE=1                  collect in-process histograms/counters
+#   ATLAS_TRACE_FILE=trace.jsonl   also append every span as one JSON line
+#   ATLAS_METRICS_PORT=9464        also serve Prometheus text at http://host:port/metrics
+# When disabled, span() returns a shared no-op object and traced() adds one
+# flag check per call.
+
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets in seconds - spans range from ms-scale routing to 40 s LLM timeouts
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+_enabled = False
+_trace_queue = None
+_lock = threading.Lock()
+_histograms = {}   # stage -> {"buckets": [...], "sum": s, "count": n}
+_counters = {}     # (name, labels) -> value
+_gauges = {}       # (name, labels) -> value
+_turn_ids = itertools.count(1)
+_current_turn = None
+
+
+def enabled():
+    return _enabled
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "turn", "start", "wall")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.turn = _current_turn
+
+    def __enter__(self):
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        observe(self.name, duration)
+        if _trace_queue is not None:
+            record = {"name": self.name, "turn": self.turn, "ts": round(self.wall, 6),
+                      "duration_ms": round(duration * 1000, 3)}
+            if self.attrs:
+                record["attrs"] = self.attrs
+            if exc_type is not None:
+                record["error"] = exc_type.__name__
+            _trace_queue.put(record)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes discovered while the span is running"""
+        self.attrs.update(attrs)
+
+
+def span(name, **attrs):
+    """Context manager timing one stage: `with tracing.span("transcribe"): ...`"""
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def new_turn():
+    """Start a new turn; later spans are tagged with its id in the trace file"""
+    global _current_turn
+    if _enabled:
+        _current_turn = next(_turn_ids)
+    return _current_turn
+
+
+# ────────────────────────────────────────────────
+# METRICS
+# ────────────────────────────────────────────────
+
+def observe(stage, seconds):
+    """Record one duration in the stage's histogram"""
+    if not _enabled:
+        return
+    with _lock:
+        h = _histograms.get(stage)
+        if h is None:
+            h = _histograms[stage] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h["buckets"][i] += 1
+                break
+        h["sum"] += seconds
+        h["count"] += 1
+
+
+def inc(name, value=1, **labels):
+    """Increment a counter, e.g. inc("api_failures", endpoint="/api/ask")"""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = value
+
+
+def snapshot():
+    """Copy of all metrics as plain dicts"""
+    with _lock:
+        return {
+            "histograms": {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                           for k, v in _histograms.items()},
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+        }
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def render_prometheus():
+    """Metrics in the Prometheus text exposition format"""
+    snap = snapshot()
+    lines = []
+
+    if snap["histograms"]:
+        lines.append("# HELP atlas_stage_duration_seconds Time spent in each voice pipeline stage")
+        lines.append("# TYPE atlas_stage_duration_seconds histogram")
+        for stage, h in sorted(snap["histograms"].items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h["buckets"]):
+                cumulative += n
+                lines.append(f'atlas_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'atlas_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {h["count"]}')
+            lines.append(f'atlas_stage_duration_seconds_sum{{stage="{stage}"}} {h["sum"]:.6f}')
+            lines.append(f'atlas_stage_duration_seconds_count{{stage="{stage}"}} {h["count"]}')
+
+    for name in sorted({k[0] for k in snap["counters"]}):
+        lines.append(f"# TYPE atlas_{name}_total counter")
+        for (n, labels), value in sorted(snap["counters"].items()):
+            if n == name:
+                lines.append(f"atlas_{name}_total{_labels(labels)} {value}")
+
+    for name in sorted({k[0] for k in snap["gauges"]}):
+        lines.append(f"# TYPE atlas_{name} gauge")
+        for (n, labels), value in sorted(snap["gauges"].items()):
+            if n == name:
+                lines.append(f"atlas_{name}{_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ────────────────────────────────────────────────
+# EXPORTERS
+# ────────────────────────────────────────────────
+
+def _trace_writer(path, q):
+    with open(path, "a", encoding="utf-8") as f:
+        while True:
+            record = q.get()
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Flush once the burst of spans from a turn has been written
+            if q.empty():
+                f.flush()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("/metrics", ""):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="atlas-metrics").start()
+    return server
+
+
+def configure(enable=None, trace_file=None, metrics_port=None):
+    """Turn tracing on/off and start the requested exporters (defaults from env)"""
+    global _enabled, _trace_queue
+    trace_file = trace_file or os.getenv("ATLAS_TRACE_FILE")
+    metrics_port = metrics_port or os.getenv("ATLAS_METRICS_PORT")
+    if enable is None:
+        enable = os.getenv("ATLAS_TRACE", "0") != "0" or bool(trace_file) or bool(metrics_port)
+
+    _enabled = bool(enable)
+    if not _enabled:
+        return
+
+    if trace_file and _trace_queue is None:
+        _trace_queue = queue.Queue()
+        threading.Thread(target=_trace_writer, args=(trace_file, _trace_queue),
+                         daemon=True, name="atlas-trace-writer").start()
+        print(f"📈 Tracing spans to {trace_file}")
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+        print(f"📈 Prometheus metrics at http://127.0.0.1:{int(metrics_port)}/metrics")
@@ -2,20 +2,20 @@
 # voice_client.py - Wake word → record → base64 → /api/transcribe → /api/ask → speak
 
 import json
+import math
 import sys
 import time
 import requests
 import os
 import wave
 import base64
+import io
 import re
 from dotenv import load_dotenv
-import pyaudio
-from vosk import Model, KaldiRecognizer, SetLogLevel
+from vosk import SetLogLevel
 import pyttsx3
 import tempfile
 import uuid
-import winsound
 from spotify_control import (
     search_and_play,
     play_pause,
@@ -23,9 +23,19 @@ from spotify_control import (
     previous_track,
     get_current_track,
     set_volume,
-    play_playlist
+    play_playlist,
+    search_track,
+    play_track
 )
 from num2words import num2words
+from audio_conditioning import condition_audio
+from audio_health import RecognizerMonitor, capture_summary, chunk_rms
+from vosk_models import ModelRegistry, LanguageProbe
+from speculation import Speculation, transcript_key, stats_summary as speculation_summary
+from history_store import HistoryStore
+import api_client
+import system_commands
+import tracing
 import re
 
 SetLogLevel(-1)
@@ -59,22 +69,24 @@ def format_numbers_for_speech(text):
     return text
 
 
-# TTS setup (offline)
-tts_engine = pyttsx3.init('sapi5')  # Use Windows SAPI5 directly
-tts_engine.setProperty('volume', 0.9)
+# TTS setup (offline) - SAPI5 only exists on Windows; headless Linux runs without it
+try:
+    tts_engine = pyttsx3.init('sapi5')  # Use Windows SAPI5 directly
+    tts_engine.setProperty('volume', 0.9)
 
-# Get available voices
-available_voices = tts_engine.getProperty('voices')
+    # Get available voices
+    available_voices = tts_engine.getProperty('voices')
+except Exception:
+    tts_engine = None
+    available_voices = []
 # print(f"[TTS] Available voices: {[v.name for v in available_voices]}")
 
 import subprocess
 import asyncio
 import edge_tts
-os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "1"
-import pygame
-
-# Initialize pygame mixer for audio playback
-pygame.mixer.init()
+from audio_io import source_from_spec, sink_from_spec
+from capture import CaptureStream
+from playback import Speaker, BargeInListener
 
 # Edge TTS voice - British male for JARVIS-like sound
 EDGE_VOICE = "en-GB-RyanNeural"  # British male voice
@@ -89,56 +101,80 @@ async def _edge_speak(text, voice=EDGE_VOICE):
     
     return tmp_path
 
-def speak(text):
-    """Speak text using Edge TTS (JARVIS-like British voice)"""
-    try:
-        print(f"🗣 Speaking: {text}")
-        # print(f"[TTS] Using Edge TTS voice: {EDGE_VOICE}")
-        
-        # Run async Edge TTS
+def synthesize(text):
+    """Render text to a temp mp3 with Edge TTS (in the current language's voice) and return its path"""
+    with tracing.span("tts.synthesize", chars=len(text)):
         loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         try:
-            audio_file = loop.run_until_complete(_edge_speak(text))
+            return loop.run_until_complete(_edge_speak(text, LANGUAGES[current_lang]["voice"]))
         finally:
             loop.close()
-        
-        # print(f"[TTS] Audio file created: {audio_file}")
-        
-        # Play using pygame
-        # print(f"[TTS] Playing audio via pygame...")
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
-        
-        # Wait for playback to finish
-        while pygame.mixer.music.get_busy():
-            pygame.time.wait(100)
-        
-        # print(f"[TTS] Playback finished")
-        
-        # Clean up temp file
-        try:
-            pygame.mixer.music.unload()
-            os.remove(audio_file)
-        except:
-            pass
-            
+
+def discard_audio(audio_file):
+    """Delete a pre-synthesized file that will never be played"""
+    try:
+        os.remove(audio_file)
+    except OSError:
+        pass
+
+def sapi_speak(text):
+    """Blocking Windows SAPI fallback when Edge TTS is unavailable"""
+    try:
+        escaped_text = text.replace("'", "''").replace('"', '`"')
+        ps_command = f'''
+        Add-Type -AssemblyName System.Speech
+        $synth = New-Object System.Speech.Synthesis.SpeechSynthesizer
+        $synth.Rate = 1
+        $synth.Speak("{escaped_text}")
+        '''
+        subprocess.run(["powershell", "-Command", ps_command], timeout=30)
+    except Exception as e2:
+        print(f"[TTS] Fallback also failed: {e2}")
+
+# Set when the user talks over ATLAS: (preroll frames, live capture queue, stop phrase)
+pending_barge_in = None
+
+def speak(text, audio_file=None, listen=True):
+    """Speak text using Edge TTS (JARVIS-like British voice).
+    Pass audio_file to play speech that was already synthesized.
+
+    While speaking, the shared capture stream is watched for barge-in: if the
+    user starts talking or says a stop phrase, playback stops at once, the
+    rest of the reply is dropped and the captured speech is left in
+    pending_barge_in for the next record_command(). Returns True if the
+    reply played to the end."""
+    global pending_barge_in
+    print(f"🗣 Speaking: {text}")
+    # print(f"[TTS] Using Edge TTS voice: {EDGE_VOICE}")
+
+    listener = None
+    # Lossless replay sources must not lose audio to the barge-in listener
+    if listen and BARGE_IN and capture.running and not capture.lossless:
+        # Never wait on a model that is still loading (e.g. right after "speak greek"):
+        # use a loaded language, or listen for energy alone
+        lang = next((l for l in [current_lang] + models.languages if models.loaded(l)), None)
+        listener = BargeInListener(capture, speaker.interrupt,
+                                   recognizer=models.recognizer(lang, RATE) if lang else None,
+                                   stop_phrases=STOP_PHRASES, spoken_text=text).start()
+
+    try:
+        with tracing.span("tts.playback") as sp:
+            speaker.say(text, audio_file=audio_file)
+            finished = speaker.wait()
+            sp.set(interrupted=not finished)
     except Exception as e:
         print(f"[TTS] Edge TTS error: {e}, falling back to SAPI...")
-        import traceback
-        traceback.print_exc()
-        # Fallback to Windows SAPI
-        try:
-            escaped_text = text.replace("'", "''").replace('"', '`"')
-            ps_command = f'''
-            Add-Type -AssemblyName System.Speech
-            $synth = New-Object System.Speech.Synthesis.SpeechSynthesizer
-            $synth.Rate = 1
-            $synth.Speak("{escaped_text}")
-            '''
-            subprocess.run(["powershell", "-Command", ps_command], timeout=30)
-        except Exception as e2:
-            print(f"[TTS] Fallback also failed: {e2}")
+        speaker.interrupt()
+        sapi_speak(text)
+        finished = True
+    finally:
+        barge_in = listener.handoff() if listener else None
+
+    if barge_in:
+        print(f"✋ Barge-in{' (stop phrase)' if barge_in[2] else ''} → playback stopped")
+        pending_barge_in = barge_in
+        tracing.inc("barge_ins", stop_phrase=bool(barge_in[2]))
+    return finished
 
 # Global variable to track playback state
 is_playing = False
@@ -155,8 +191,9 @@ load_dotenv()
 env_model = os.getenv("VOSK_MODEL_PATH")
 model_en = os.getenv("VOSK_MODEL_PATH_EN")
 model_el = os.getenv("VOSK_MODEL_PATH_EL")
-# Force the client language to English only
-client_lang = "en"
+# Spoken language: en, el, or auto to detect it on every utterance
+client_lang = {"english": "en", "greek": "el", "gr": "el"}.get(
+    os.getenv("VOSK_LANG", "en").lower(), os.getenv("VOSK_LANG", "en").lower())
 
 def choose_model_path():
     # If legacy env set and valid, prefer it
@@ -191,7 +228,28 @@ if not MODEL_PATH:
     print(f"Checked values: VOSK_MODEL_PATH={env_model}, VOSK_MODEL_PATH_EN={model_en}, VOSK_MODEL_PATH_EL={model_el}, VOSK_LANG={client_lang}")
     sys.exit(1)
 
-API_URL = "http://localhost:3000"
+LANGUAGES = {
+    "en": {"name": "English", "voice": EDGE_VOICE},
+    "el": {"name": "Greek", "voice": "el-GR-NestorasNeural"},
+}
+
+# Both models stay resident once loaded so switching language never reloads one.
+# A legacy VOSK_MODEL_PATH stands in for the configured (default English) model.
+_model_paths = {"en": model_en, "el": model_el}
+if env_model and os.path.isdir(env_model):
+    _model_paths[client_lang if client_lang in LANGUAGES else "en"] = env_model
+models = ModelRegistry(_model_paths)
+
+# Language of the current utterance - follows commands and auto-detection
+current_lang = client_lang if client_lang in models.languages else models.languages[0]
+# Language the last recognizer was built for (to measure switches)
+recognizer_lang = current_lang
+
+# Load every model at startup instead of on first use (always on with VOSK_LANG=auto)
+PRELOAD_MODELS = os.getenv("ATLAS_PRELOAD_MODELS", "0") != "0"
+
+# Spoken when /api/ask is down; rule-based music/system intents keep working
+OFFLINE_REPLY = "I can't reach the server right now, but I can still control music and open apps."
 
 # Stop phrases checked while recording
 STOP_PHRASES = [
@@ -199,7 +257,8 @@ STOP_PHRASES = [
     "that's all for today",
     "ok that's all",
     "goodbye atlas",
-    "goodbye"
+    "goodbye",
+    "αντίο"
 ]
 
 # Wake words to bring ATLAS out of hibernate mode
@@ -208,101 +267,219 @@ WAKE_WORDS = [
     "hey atlas",
     "ok atlas",
     "hello atlas",
+    "άτλας",
 ]
 
 # Recording settings
 RATE = 16000
 CHANNELS = 1
-FORMAT = pyaudio.paInt16
 CHUNK = 1024
 RECORD_SECONDS = 10          # max recording time – adjust as needed
 SILENCE_THRESHOLD = 500      # energy level for silence detection
 SILENCE_DURATION = 1.5       # seconds of silence to stop recording early
 MIN_SPEECH_LENGTH = 2        # minimum characters for valid speech
 
+# Let the user interrupt ATLAS mid-reply. Off by default: without a headset or echo
+# cancellation the mic hears ATLAS itself (set ATLAS_BARGE_IN=1 to enable)
+BARGE_IN = os.getenv("ATLAS_BARGE_IN", "0") == "1"
+
+# Websites/searches/apps launch on this machine; "remote" sends them to /api/system-commands
+SYSTEM_COMMAND_MODE = os.getenv("ATLAS_SYSTEM_COMMANDS", "local")
+
+# Audio in/out - mic and speakers by default. For headless or deterministic runs:
+#   ATLAS_AUDIO_SOURCE=wav:fixtures/ | wav-fast:fixtures/ | pipe:- (raw 16 kHz s16le)
+#   ATLAS_AUDIO_SINK=null | null-realtime
+AUDIO_SOURCE = os.getenv("ATLAS_AUDIO_SOURCE", "mic")
+AUDIO_SINK = os.getenv("ATLAS_AUDIO_SINK", "pygame")
+
+# One audio stream shared by recording, hibernate and barge-in detection
+capture = CaptureStream(source_from_spec(AUDIO_SOURCE, RATE, CHANNELS, CHUNK))
+
+# Synthesis and playback run on background threads; speak() only waits on events
+speaker = Speaker(synthesize, sink=sink_from_spec(AUDIO_SINK),
+                  fallback=sapi_speak if sys.platform == 'win32' else None)
+
 # Words/phrases to ignore (noise artifacts)
 NOISE_WORDS = {'', 'huh', 'uh', 'um', 'hmm', 'ah', 'oh', 'eh', 'a', 'the', 'i', 'it'}
 
+# Conversation history is appended to an on-disk log off the response path and the
+# last ATLAS_RESUME_TURNS turns are resumed at startup (ATLAS_HISTORY=0 keeps it in memory only)
+HISTORY_DIR = os.getenv("ATLAS_HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "history"))
+RESUME_TURNS = int(os.getenv("ATLAS_RESUME_TURNS", "10"))
+history_store = HistoryStore(HISTORY_DIR) if os.getenv("ATLAS_HISTORY", "1") != "0" else None
+
 # Conversation history (persists across interactions)
 conversation_history = []
-
-print(f"Vosk model: {MODEL_PATH}")
+if history_store:
+    _resume_start = time.perf_counter()
+    conversation_history = history_store.load_recent(RESUME_TURNS)
+    if conversation_history:
+        print(f"📚 Resumed {len(conversation_history) // 2} turn(s) from {HISTORY_DIR} "
+              f"in {(time.perf_counter() - _resume_start) * 1000:.1f} ms")
+
+# Phrases that start a fresh conversation (resume will not go back past them)
+RESET_PHRASES = ["new conversation", "forget our conversation", "start over"]
+
+def get_model(lang=None):
+    """The resident Vosk model for a language (the current one by default)"""
+    return models.get(lang or current_lang)
+
+def recognizer_for(lang, replay=()):
+    """A recognizer for lang with the audio heard so far replayed into it.
+    Returns (recognizer, text recognized in the replay)"""
+    global current_lang, recognizer_lang
+    old = recognizer_lang
+    rec, seconds, text = models.switch(old, lang, RATE, replay)
+    if lang != old:
+        print(f"🌐 Language: {LANGUAGES[old]['name']} → {LANGUAGES[lang]['name']} ({seconds * 1000:.0f} ms)")
+    current_lang = recognizer_lang = lang
+    return rec, text.lower()
+
+def heard_stop_phrase(text):
+    """True if text contains one of the STOP_PHRASES"""
+    return any(phrase.lower() in text.lower() for phrase in STOP_PHRASES)
+
+print(f"Vosk models: {', '.join(f'{lang}={path}' for lang, path in models.paths.items())} (language: {client_lang})")
 print("Ready to listen...\n")
 
 # ────────────────────────────────────────────────
 # RECORD FUNCTION
 # ────────────────────────────────────────────────
 
-def record_command():
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT,
-                    channels=CHANNELS,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK)
+def record_command(preroll=None, audio_queue=None):
+    """Record one command from the shared capture stream.
+
+    preroll/audio_queue come from a barge-in: the speech that interrupted
+    playback and the still-live capture subscription it was heard on."""
+    q = audio_queue if audio_queue is not None else capture.subscribe()
 
     print("🎤 Recording...")
 
     frames = []
-    start_time = time.time()
     last_text = ""
     stop_detected = False
 
-    # Create a Vosk recognizer to detect stop phrases in real-time
-    model = Model(MODEL_PATH)
-    rec = KaldiRecognizer(model, RATE)
-
-    while time.time() - start_time < RECORD_SECONDS:
-        data = stream.read(CHUNK, exception_on_overflow=False)
-        frames.append(data)
-
-        # Feed data to Vosk recognizer to detect stop phrase
-        if rec.AcceptWaveform(data):
-            result = json.loads(rec.Result())
-            text = result.get("text", "").strip().lower()
-            if text:
-                last_text = text
-                print(f"[Real-time] You said: {text}")
-                # Check for stop phrase
-                if any(phrase.lower() in text.lower() for phrase in STOP_PHRASES):
-                    print("⛔ Stop phrase detected → stopping recording")
-                    stop_detected = True
-                    break
-        else:
-            # Check partial results too for faster detection
-            partial = json.loads(rec.PartialResult())
-            ptext = partial.get("partial", "").strip().lower()
-            if ptext:
-                last_text = ptext
-            if ptext and any(phrase.lower() in ptext.lower() for phrase in STOP_PHRASES):
-                print(f"⛔ Stop phrase detected in partial: {ptext}")
-                stop_detected = True
-                break
+    # Limits are counted in audio, not wall-clock time, so a fast replay
+    # endpoints exactly where a live microphone would
+    max_chunks = int(RECORD_SECONDS / capture.chunk_seconds)
+    silence_chunks = math.ceil(SILENCE_DURATION / capture.chunk_seconds)
+    heard_speech = False
+    silent = 0
+
+    # Create a Vosk recognizer to detect stop phrases in real-time. In auto mode
+    # every loaded language listens to the first second of speech and the most
+    # confident one gets the utterance.
+    probe = None
+    rec = None
+    probe_langs = [lang for lang in models.languages if models.loaded(lang)]
+    if client_lang == "auto" and len(probe_langs) > 1:
+        probe = LanguageProbe(models, probe_langs, RATE, current_lang, SILENCE_THRESHOLD)
+    else:
+        rec, _ = recognizer_for(current_lang)
+    monitor = RecognizerMonitor("record", capture.chunk_seconds, SILENCE_THRESHOLD,
+                                adaptive=not capture.lossless)
+
+    pending = list(preroll or [])
+    with tracing.span("record") as record_span:
+        try:
+            while len(frames) < max_chunks:
+                data = pending.pop(0) if pending else q.get()
+                if not data:
+                    break  # capture stream closed
+                frames.append(data)
+
+                # End the utterance on SILENCE_DURATION of quiet after speech
+                if chunk_rms(data) >= SILENCE_THRESHOLD:
+                    heard_speech, silent = True, 0
+                else:
+                    silent += 1
+                    if heard_speech and silent >= silence_chunks:
+                        print("🔇 Silence detected → stopping recording")
+                        break
+
+                # Falling behind real time: keep the audio but don't decode silence.
+                # Still observed, so RTF and queue depth can recover and end overload mode
+                if monitor.should_skip(data):
+                    monitor.observe(0.0, q.qsize() + len(pending))
+                    continue
 
-    print("✅ Recording finished")
+                # Feed data to Vosk recognizer to detect stop phrase
+                decode_start = time.perf_counter()
+                if rec is None:
+                    lang = probe.feed(data)
+                    heard = list(probe.heard)
+                    if lang is not None:
+                        rec, replayed = recognizer_for(lang, frames)
+                        if replayed:
+                            last_text = replayed
+                            heard.append(replayed)
+                    monitor.observe(time.perf_counter() - decode_start, q.qsize() + len(pending))
+                    # Stop phrases count while the language is still being picked too
+                    if heard_stop_phrase(" ".join(heard)):
+                        print("⛔ Stop phrase detected → stopping recording")
+                        stop_detected = True
+                        break
+                    continue
+                if rec.AcceptWaveform(data):
+                    result = json.loads(rec.Result())
+                    text = result.get("text", "").strip().lower()
+                    if text:
+                        last_text = text
+                        print(f"[Real-time] You said: {text}")
+                        # Check for stop phrase
+                        if heard_stop_phrase(text):
+                            print("⛔ Stop phrase detected → stopping recording")
+                            stop_detected = True
+                            break
+                elif monitor.decode_partials:
+                    # Check partial results too for faster detection
+                    partial = json.loads(rec.PartialResult())
+                    ptext = partial.get("partial", "").strip().lower()
+                    if ptext:
+                        last_text = ptext
+                    if ptext and heard_stop_phrase(ptext):
+                        print(f"⛔ Stop phrase detected in partial: {ptext}")
+                        stop_detected = True
+                        break
+                monitor.observe(time.perf_counter() - decode_start, q.qsize() + len(pending))
+        finally:
+            capture.unsubscribe(q)
+            record_span.set(chunks=len(frames), stop_detected=stop_detected, rtf=round(monitor.rtf, 3))
 
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+    # Utterance ended before the probe heard enough speech - decide with what we have
+    if rec is None and frames:
+        rec, replayed = recognizer_for(probe.decide(), frames)
+        final = json.loads(rec.FinalResult()).get("text", "").strip().lower()
+        last_text = " ".join(t for t in (replayed, final) if t) or last_text
+        stop_detected = stop_detected or heard_stop_phrase(last_text)
+
+    print(f"✅ Recording finished ({monitor.summary()})")
 
     if not frames:
         return None, None, False
 
-    # Save to in-memory WAV → base64
-    wf_data = b''.join(frames)
-    with wave.open("temp_in_memory.wav", 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(wf_data)
+    # Trim silence/clicks, high-pass and normalize before anything leaves the machine
+    with tracing.span("endpoint") as sp:
+        conditioned, stats = condition_audio(b''.join(frames), RATE)
+        sp.set(ms_saved=round(stats["ms_saved"]), bytes_saved=stats["bytes_saved"])
+    if conditioned is None:
+        tracing.inc("noise_skips", reason="no_speech")
+        print(f"[Noise] No speech frames in {stats['original_ms']:.0f} ms of audio, skipping upload...")
+        return None, last_text, stop_detected
 
-    with open("temp_in_memory.wav", "rb") as f:
-        audio_base64 = base64.b64encode(f.read()).decode('utf-8')
+    print(f"✂️ Conditioned audio: saved {stats['ms_saved']:.0f} ms / {stats['bytes_saved'] / 1024:.1f} KB "
+          f"({stats['ms']:.0f} ms uploaded, gain x{stats['gain']:.1f})")
 
-    try:
-        os.remove("temp_in_memory.wav")  # cleanup
-    except:
-        pass
+    # Save to in-memory WAV → base64
+    with tracing.span("encode"):
+        buf = io.BytesIO()
+        with wave.open(buf, 'wb') as wf:
+            wf.setnchannels(CHANNELS)
+            wf.setsampwidth(capture.sample_width)
+            wf.setframerate(RATE)
+            wf.writeframes(conditioned)
+
+        audio_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
 
     return audio_base64, last_text, stop_detected
 
@@ -316,67 +493,62 @@ def hibernate_mode():
     print("\n💤 ATLAS is now in hibernate mode...")
     print("💡 Say a wake word to reactivate (e.g., 'Hey Atlas')\n")
 
-    model = Model(MODEL_PATH)
-    rec = KaldiRecognizer(model, RATE)
-
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT,
-                    channels=CHANNELS,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK)
+    rec = models.recognizer(current_lang, RATE)
+    monitor = RecognizerMonitor("hibernate", capture.chunk_seconds, SILENCE_THRESHOLD,
+                                adaptive=not capture.lossless)
+    q = capture.subscribe()
 
     try:
         while True:
-            data = stream.read(CHUNK, exception_on_overflow=False)
+            data = q.get()
+            if not data:
+                return True  # capture stream closed - don't get stuck asleep
+            if monitor.should_skip(data):
+                monitor.observe(0.0, q.qsize())
+                continue
+            decode_start = time.perf_counter()
             if rec.AcceptWaveform(data):
                 result = json.loads(rec.Result())
                 text = result.get("text", "").strip().lower()
                 if text and any(wake.lower() in text for wake in WAKE_WORDS):
                     print(f"\n🔔 Wake word detected: '{text}'")
-                    stream.stop_stream()
-                    stream.close()
-                    p.terminate()
                     return True
-            else:
+            elif monitor.decode_partials:
                 partial = json.loads(rec.PartialResult())
                 ptext = partial.get("partial", "").strip().lower()
                 if ptext and any(wake.lower() in ptext for wake in WAKE_WORDS):
                     print(f"\n🔔 Wake word detected (partial): '{ptext}'")
-                    stream.stop_stream()
-                    stream.close()
-                    p.terminate()
                     return True
+            monitor.observe(time.perf_counter() - decode_start, q.qsize())
     except KeyboardInterrupt:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
         raise  # Re-raise so main() can handle the Ctrl+C exit
     except Exception as e:
         print(f"❌ Hibernate error: {e}")
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
         return True  # Return to active mode on error so we don't get stuck
+    finally:
+        capture.unsubscribe(q)
 
 # ────────────────────────────────────────────────
 # MAIN LOOP
 # ────────────────────────────────────────────────
 def parse_music_command(transcription):
     """Use AI to parse unclear voice commands"""
-    import requests
-    
+    # Server or Groq down - go straight to the rule-based intents
+    if not api_client.is_available("/api/ask"):
+        return transcription
+
     try:
         # Ask Groq to interpret the command
-        response = requests.post(
-            "http://localhost:3000/api/ask",
-            json={
-                "text": f"This voice command was transcribed with errors: '{transcription}'. What music action is the user trying to do? Reply with ONLY ONE of: 'play [song/artist name]', 'pause', 'next', 'previous', 'volume up', 'volume down', 'playlist [name]', or 'unknown'",
-                "context": {},
-                "conversationHistory": []
-            },
-            timeout=10
-        )
+        with tracing.span("llm.parse_music"):
+            response = api_client.post(
+                "/api/ask",
+                json={
+                    "text": f"This voice command was transcribed with errors: '{transcription}'. What music action is the user trying to do? Reply with ONLY ONE of: 'play [song/artist name]', 'pause', 'next', 'previous', 'volume up', 'volume down', 'playlist [name]', or 'unknown'",
+                    "context": {},
+                    "conversationHistory": []
+                },
+                timeout=10
+            )
         
         cleaned = response.json()['response'].strip().lower()
         return cleaned
@@ -452,104 +624,276 @@ def handle_music_command(transcription):
     return None #Not a music command
 
 def handle_system_command(transcription):
-    """Handle computer control commands - DYNAMIC VERSION"""
+    """Handle computer control commands - DYNAMIC VERSION.
+
+    Returns the spoken confirmation at once; the website/search/app is
+    launched in the background (locally, or through /api/system-commands
+    with ATLAS_SYSTEM_COMMANDS=remote)."""
+    command = system_commands.parse(transcription)
+    if command is None:
+        return None  # Not a system command
+    system_commands.launch(command, remote=SYSTEM_COMMAND_MODE == "remote")
+    return command.reply
+
+# Spoken commands that change the language ATLAS listens and answers in
+LANGUAGE_COMMANDS = {
+    "en": ["speak english", "switch to english", "english please", "μίλα αγγλικά"],
+    "el": ["speak greek", "switch to greek", "greek please", "μίλα ελληνικά"],
+    "auto": ["detect language", "detect the language", "automatic language"],
+}
+
+def handle_language_command(transcription):
+    """Switch language by voice; 'auto' detects it on every utterance"""
+    global client_lang, current_lang
     text_lower = transcription.lower()
-    
-    # DYNAMIC: Open any website
-    if "open website" in text_lower or "go to" in text_lower:
-        # Extract website name
-        if "open website" in text_lower:
-            site = text_lower.split("open website", 1)[1].strip()
-        else:
-            site = text_lower.split("go to", 1)[1].strip()
-        
-        # Add .com if no extension
-        if "." not in site:
-            site = f"{site}.com"
-        
-        # Add https:// if missing
-        if not site.startswith("http"):
-            site = f"https://{site}"
-        
-        try:
-            r = requests.post(f"{API_URL}/api/system-command",
-                            json={"action": "open-url", "parameter": site},
-                            timeout=5)
-            return f"Opening {site}"
-        except:
-            return f"Failed to open {site}"
-    
-    # SHORTCUT: Common websites (no need to say "open website")
-    common_sites = {
-        "youtube": "https://youtube.com",
-        "google": "https://google.com",
-        "netflix": "https://netflix.com",
-        "facebook": "https://facebook.com",
-        "twitter": "https://twitter.com",
-        "reddit": "https://reddit.com",
-        "instagram": "https://instagram.com",
-        "gmail": "https://gmail.com",
-        "spotify": "https://open.spotify.com",
-        "amazon": "https://amazon.com",
-        "github": "https://github.com"
+    lang = next((l for l, phrases in LANGUAGE_COMMANDS.items() if any(p in text_lower for p in phrases)), None)
+    if lang is None:
+        return None
+
+    if lang == "auto":
+        if len(models.languages) < 2:
+            return "I only have one language model installed."
+        client_lang = "auto"
+        models.preload()
+        return "I'll detect the language automatically."
+
+    if lang not in models.languages:
+        return f"I don't have a {LANGUAGES[lang]['name']} model installed."
+    client_lang = current_lang = lang
+    # Load it while the confirmation plays so the next utterance doesn't stall
+    models.preload([lang])
+    return "Εντάξει, θα μιλάμε ελληνικά." if lang == "el" else "Okay, I'll speak English."
+
+# Prefix of the system instruction that pins the reply language
+LANGUAGE_INSTRUCTION = "You are ATLAS assistant. Please respond ONLY in"
+
+def build_ask_payload(text, history, lang="en"):
+    """Build the /api/ask payload with a system instruction pinning the reply language"""
+    name = LANGUAGES[lang]["name"]
+    # Build a copy of the conversation history and prepend a system instruction,
+    # replacing one left over from before a language switch
+    send_history = [m for m in (history or [])
+                    if not (isinstance(m, dict) and m.get("role") == "system"
+                            and m.get("content", "").startswith(LANGUAGE_INSTRUCTION))]
+    send_history.insert(0, {"role": "system", "content": f"{LANGUAGE_INSTRUCTION} {name}."})
+
+    return {
+        "text": text,
+        "context": {
+            "temperature": 23.5,
+            "humidity": 65,
+            "location": "New Philadelphia, Greece",
+            "forceResponseLanguage": lang
+        },
+        "conversationHistory": send_history,  # send copy with system instruction
+        "responseLanguage": lang,
+        "systemPrompt": f"Please respond only in {name}."
     }
-    
-    for site_name, url in common_sites.items():
-        if f"open {site_name}" in text_lower:
-            try:
-                r = requests.post(f"{API_URL}/api/system-command",
-                                json={"action": "open-url", "parameter": url},
-                                timeout=5)
-                return f"Opening {site_name}"
-            except:
-                return f"Failed to open {site_name}"
-    
-    # DYNAMIC: Search Google
-    if "search for" in text_lower or "google search" in text_lower or "search" in text_lower:
-        # Extract query
-        if "search for" in text_lower:
-            query = text_lower.split("search for", 1)[1].strip()
-        elif "google search" in text_lower:
-            query = text_lower.split("google search", 1)[1].strip()
+
+def extract_play_query(text):
+    """Return the song/artist for a plain 'play X' command, else None"""
+    text_lower = text.lower()
+    if "play " not in text_lower or "spotify" in text_lower or "playlist" in text_lower:
+        return None
+    return text_lower.split("play", 1)[1].strip() or None
+
+# ────────────────────────────────────────────────
+# SPECULATIVE EXECUTION
+# ────────────────────────────────────────────────
+
+# Words that route a transcript to handle_music_command()/handle_system_command()
+LOCAL_INTENT_WORDS = [
+    "pause", "stop music", "resume", "continue", "next", "skip", "previous", "back",
+    "what's playing", "what song", "current song", "volume", "playlist",
+    "open ", "launch ", "go to", "search",
+] + RESET_PHRASES + [phrase for phrases in LANGUAGE_COMMANDS.values() for phrase in phrases]
+
+def _speculate_play(query):
+    """Search Spotify and pre-synthesize the confirmation (no playback yet)"""
+    track = search_track(query)
+    if not track:
+        return None
+    reply = f"Playing {track['name']} by {track['artists'][0]['name']}"
+    return {"track": track, "reply": reply, "audio_file": synthesize(reply)}
+
+def _speculate_ask(text, history, lang):
+    """Warm /api/ask with the local transcript and pre-synthesize the answer"""
+    with tracing.span("llm.ask", speculative=True):
+        r = api_client.post("/api/ask", json=build_ask_payload(text, history, lang), timeout=40)
+    r.raise_for_status()
+    resp_data = r.json()
+    answer = resp_data.get("response", "No response.")
+    return {"resp_data": resp_data, "audio_file": synthesize(answer)}
+
+def _discard_speculative_audio(result):
+    discard_audio(result["audio_file"])
+
+def _play_key(text):
+    return transcript_key(extract_play_query(text) or "")
+
+def speculate(local_text):
+    """Route the local Vosk transcript to an intent and start its expensive work"""
+    query = extract_play_query(local_text) if local_text else None
+    if query:
+        # The track is only reusable if Whisper heard the same song, not just a similar sentence
+        speculation = Speculation(local_text, key=_play_key)
+        speculation.submit("play", _speculate_play, query, on_discard=_discard_speculative_audio)
+        return speculation
+
+    speculation = Speculation(local_text)
+    if not local_text:
+        return speculation
+
+    if any(word in local_text for word in LOCAL_INTENT_WORDS):
+        # Cheap local actions - nothing worth speculating on
+        pass
+    elif api_client.is_available("/api/ask"):
+        speculation.submit("ask", _speculate_ask, local_text, list(conversation_history), current_lang,
+                           on_discard=_discard_speculative_audio)
+
+    return speculation
+
+def process_command(audio_b64, last_text):
+    """Transcribe one recorded command and act on it: music, system or /api/ask"""
+    global conversation_history, is_playing
+
+    # Start acting on the local transcript while the cloud one is in flight
+    speculation = speculate(last_text)
+
+    # Send to /api/transcribe
+    try:
+        # Build payload and transcribe in the language this utterance was heard in
+        payload = {"audio": audio_b64, "language": current_lang}
+
+        try:
+            with tracing.span("transcribe", bytes=len(audio_b64)):
+                r = api_client.post("/api/transcribe-groq", json=payload, timeout=20)
+            r.raise_for_status()
+            trans_data = r.json()
+            transcription = trans_data.get("transcription", "").strip()
+        except requests.exceptions.RequestException as e:
+            # Cloud transcription unavailable - the Vosk transcript is good enough
+            print(f"⚠️ Transcription unavailable ({e}), using local transcript")
+            transcription = last_text
+
+        # Filter out noise/gibberish
+        if not transcription or len(transcription) < MIN_SPEECH_LENGTH:
+            print(f"[Noise] Transcription too short: '{transcription}', skipping...")
+            tracing.inc("noise_skips", reason="short_transcript")
+            return
+
+        # Filter out common noise words
+        if transcription.lower() in NOISE_WORDS:
+            print(f"[Noise] Detected noise word: '{transcription}', skipping...")
+            tracing.inc("noise_skips", reason="noise_word")
+            return
+
+        print(f"👤 You: {transcription}")
+
+        # Commit the speculative work if Vosk heard the same thing, otherwise drop it
+        if speculation:
+            hit = speculation.resolve(transcription)
+            tracing.inc("speculation", result="hit" if hit else "miss")
+            print(f"⚡ Speculation {'hit' if hit else 'miss'} ({speculation_summary()})")
+
+        if any(phrase in transcription.lower() for phrase in RESET_PHRASES):
+            conversation_history = []
+            if history_store:
+                history_store.reset()
+            print("📚 Conversation history cleared")
+            speak("Okay, let's start a new conversation.")
+            return
+
+        # "speak greek" / "speak english" / "detect language"
+        language_response = handle_language_command(transcription)
+        if language_response:
+            print(f"🌐 {language_response}")
+            speak(language_response)
+            return
+
+        spec_play = speculation.result("play", timeout=20)
+        if spec_play:
+            music_response = play_track(spec_play["track"])
+            is_playing = True
+            print(f"🎵 Spotify: {music_response}")
+            if music_response == spec_play["reply"]:
+                speak(music_response, audio_file=spec_play["audio_file"])
+            else:
+                discard_audio(spec_play["audio_file"])
+                speak(music_response)
+            return
+
+        with tracing.span("intent.music"):
+            if any(word in transcription.lower() for word in ["play", "playlist", "pause", "next"]):
+                cleaned = parse_music_command(transcription)
+                print(f"🧹 Cleaned: {cleaned}")
+                music_response = handle_music_command(cleaned)
+            else:
+                music_response = handle_music_command(transcription)
+            music_response = handle_music_command(transcription)
+        if music_response:
+            print(f"🎵 Spotify: {music_response}")
+            speak(music_response)
+            return # Skip sending to AI, just handle music
+
+        # Check if it's a system command
+        with tracing.span("intent.system"):
+            system_response = handle_system_command(transcription)
+
+        if system_response:
+            print(f"💻 System: {system_response}")
+            speak(system_response)
+            return
+
+        # Use the warmed /api/ask answer when the speculation was committed
+        spec_ask = speculation.result("ask", timeout=40)
+        audio_file = None
+        if spec_ask:
+            resp_data = spec_ask["resp_data"]
+            audio_file = spec_ask["audio_file"]
         else:
-            query = text_lower.split("search", 1)[1].strip()
-        
-        if query:
+            # Send to /api/ask with conversation history
+            payload = build_ask_payload(transcription, conversation_history, current_lang)
+
             try:
-                r = requests.post(f"{API_URL}/api/system-command",
-                                json={"action": "search-google", "parameter": query},
-                                timeout=5)
-                return f"Searching for {query}"
-            except:
-                return "Failed to search"
-    
-    # DYNAMIC: Open any application
-    if "open " in text_lower or "launch " in text_lower:
-        # Extract app name
-        if "open " in text_lower:
-            app = text_lower.split("open ", 1)[1].strip()
+                with tracing.span("llm.ask"):
+                    r2 = api_client.post("/api/ask", json=payload, timeout=40)
+                r2.raise_for_status()
+                resp_data = r2.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                print(f"🔴 /api/ask unavailable ({e}), answering locally")
+                speak(OFFLINE_REPLY)
+                return
+
+        answer = resp_data.get("response", "No response.")
+        conversation_history = resp_data.get("conversationHistory", [])  # ← Update history
+        if history_store:
+            history_store.append([{"role": "user", "content": transcription},
+                                  {"role": "assistant", "content": answer}], lang=current_lang)
+
+        print(f"🤖 ATLAS: {answer}")
+        print(f"📝 Conversation length: {len(conversation_history)} messages\n")
+
+        speak(answer, audio_file=audio_file)
+
+    except requests.exceptions.RequestException as e:
+        print(f"❌ API error: {e}")
+        # Only speak error if it's a real connection issue, not noise
+        if "timeout" in str(e).lower() or "connection" in str(e).lower():
+            speak("Something went wrong with the connection.")
         else:
-            app = text_lower.split("launch ", 1)[1].strip()
-        
-        # Remove common filler words
-        app = app.replace("app", "").replace("application", "").strip()
-        
-        # Skip if it's a website or music command
-        if app in ["youtube", "google", "netflix", "facebook"] or "playlist" in app:
-            return None
-        
-        try:
-            r = requests.post(f"{API_URL}/api/system-command",
-                            json={"action": "open-app", "parameter": app},
-                            timeout=5)
-            return f"Opening {app}"
-        except:
-            return f"Failed to open {app}"
-    
-    return None  # Not a system command
+            print("[Noise] API rejected input, likely noise - skipping...")
+    except Exception as e:
+        print(f"❌ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        speak("An unexpected error occurred.")
+    finally:
+        # Anything this turn didn't use is stale - a miss, or a hit routed elsewhere
+        speculation.cancel()
 
 def main():
-    global conversation_history
+    global pending_barge_in
     
     print(""" ---------------------------------------------------------
     🎤 Starting ATLAS voice assistant...\n
@@ -559,15 +903,41 @@ def main():
 ---------------------------------------------------------
     """)
 
+    # Spans/histograms are off unless ATLAS_TRACE, ATLAS_TRACE_FILE or ATLAS_METRICS_PORT is set
+    tracing.configure()
+
+    # Probe /health in the background so outages fail over without waiting on timeouts
+    api_client.start_health_monitor(["/api/transcribe-groq", "/api/ask"])
+
+    # Auto-detection needs every language resident; load them off the startup path
+    if client_lang == "auto" or PRELOAD_MODELS:
+        models.preload()
+
+    # Mic stays open for the whole session so ATLAS can listen while it talks
+    capture.start()
+
     try:
         while True:
-            # Record until stop phrase detected
-            audio_b64, last_text, stop_detected = record_command()
+            # WAV replay / pipe sources end; the microphone never does
+            if capture.finished:
+                print("📼 Audio source exhausted, shutting down.")
+                break
+
+            # Pick up where a barge-in left off if the user talked over the last reply
+            preroll, audio_queue, barge_stop = pending_barge_in or (None, None, None)
+            pending_barge_in = None
+
+            if barge_stop:
+                capture.unsubscribe(audio_queue)
+                audio_b64, last_text, stop_detected = None, barge_stop, True
+            else:
+                # Record until stop phrase detected
+                audio_b64, last_text, stop_detected = record_command(preroll, audio_queue)
             
             # Check if user wants to hibernate
             if stop_detected and last_text:
                 if any(phrase.lower() in last_text.lower() for phrase in STOP_PHRASES):
-                    speak("Going to sleep. Say 'Hey Atlas' when you need me.")
+                    speak("Going to sleep. Say 'Hey Atlas' when you need me.", listen=False)
                     print("� Stop phrase detected. Entering hibernate mode...\n")
                     
                     # Enter hibernate — blocks until wake word is heard
@@ -588,98 +958,21 @@ def main():
                 print(f"[Noise] Detected noise only: '{last_text}', skipping...")
                 continue
 
-            # Send to /api/transcribe
-            try:
-                # Build payload and force English transcription on the server
-                payload = {"audio": audio_b64, "language": "en"}
-
-                r = requests.post(
-                    f"{API_URL}/api/transcribe-groq",
-                    json=payload,
-                    timeout=20,
-                )
-                r.raise_for_status()
-                trans_data = r.json()
-                transcription = trans_data.get("transcription", "").strip()
-
-                # Filter out noise/gibberish
-                if not transcription or len(transcription) < MIN_SPEECH_LENGTH:
-                    print(f"[Noise] Transcription too short: '{transcription}', skipping...")
-                    continue
-                
-                # Filter out common noise words
-                if transcription.lower() in NOISE_WORDS:
-                    print(f"[Noise] Detected noise word: '{transcription}', skipping...")
-                    continue
-
-                print(f"👤 You: {transcription}")
-                if any(word in transcription.lower() for word in ["play", "playlist", "pause", "next"]):
-                    cleaned = parse_music_command(transcription)
-                    print(f"🧹 Cleaned: {cleaned}")
-                    music_response = handle_music_command(cleaned)
-                else:
-                    music_response = handle_music_command(transcription)
-                music_response = handle_music_command(transcription)
-                if music_response:
-                    print(f"🎵 Spotify: {music_response}")
-                    speak(music_response)
-                    continue # Skip sending to AI, just handle music
-
-                # Check if it's a system command
-                system_response = handle_system_command(transcription)
-
-                if system_response:
-                    print(f"💻 System: {system_response}")
-                    speak(system_response)
-                    continue
-
-                # Send to /api/ask with conversation history
-                # Build a copy of the conversation history and prepend a system instruction
-                send_history = list(conversation_history) if conversation_history else []
-                if not any(isinstance(m, dict) and m.get("role") == "system" and "english" in m.get("content", "").lower() for m in send_history):
-                    send_history.insert(0, {"role": "system", "content": "You are ATLAS assistant. Please respond ONLY in English."})
-
-                payload = {
-                    "text": transcription,
-                    "context": {
-                        "temperature": 23.5,
-                        "humidity": 65,
-                        "location": "New Philadelphia, Greece",
-                        "forceResponseLanguage": "en"
-                    },
-                    "conversationHistory": send_history,  # send copy with system instruction
-                    "responseLanguage": "en",
-                    "systemPrompt": "Please respond only in English."
-                }
-
-                r2 = requests.post(f"{API_URL}/api/ask", json=payload, timeout=40)
-                r2.raise_for_status()
-                resp_data = r2.json()
-
-                answer = resp_data.get("response", "No response.")
-                conversation_history = resp_data.get("conversationHistory", [])  # ← Update history
-                
-                print(f"🤖 ATLAS: {answer}")
-                print(f"📝 Conversation length: {len(conversation_history)} messages\n")
-                
-                speak(answer)
-
-            except requests.exceptions.RequestException as e:
-                print(f"❌ API error: {e}")
-                # Only speak error if it's a real connection issue, not noise
-                if "timeout" in str(e).lower() or "connection" in str(e).lower():
-                    speak("Something went wrong with the connection.")
-                else:
-                    print("[Noise] API rejected input, likely noise - skipping...")
-            except Exception as e:
-                print(f"❌ Unexpected error: {e}")
-                import traceback
-                traceback.print_exc()
-                speak("An unexpected error occurred.")
+            tracing.new_turn()
+            tracing.inc("turns")
+            with tracing.span("turn"):
+                process_command(audio_b64, last_text)
 
     except KeyboardInterrupt:
-        speak("Goodbye!")
+        speak("Goodbye!", listen=False)
         print("\n👋 Shutting down via Ctrl+C.\n")
+    finally:
+        capture.close()
+        print(f"🎙️ Capture: {capture_summary()}")
+        print(f"🧠 Models: {models.summary()}")
+        print(f"💻 System commands: {system_commands.summary()}")
+        if history_store:
+            history_store.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# vosk_models.py - Resident Vosk models per language, loaded lazily, plus spoken-language detection
+
+import json
+import os
+import threading
+import time
+import numpy as np
+import tracing
+
+try:
+    import psutil  # optional - only used to measure what each model costs in memory
+except ImportError:
+    psutil = None
+
+# ────────────────────────────────────────────────
+# CONFIG
+# ────────────────────────────────────────────────
+
+PROBE_SECONDS = 1.0          # speech fed to every language's recognizer before picking one
+PROBE_MIN_MARGIN = 0.05      # confidence lead needed to switch away from the current language
+
+
+def resident_mb():
+    """Resident memory of this process in MB, or None if it can't be measured"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """One Vosk model per language, loaded on first use and kept resident.
+
+    Every recognizer for a language shares its model, so switching language
+    only costs a KaldiRecognizer construction once both models are loaded.
+    preload() loads models in the background so the first switch to a
+    language doesn't stall on a multi-second model load.
+    """
+
+    def __init__(self, paths):
+        self.paths = {lang: path for lang, path in paths.items() if path and os.path.isdir(path)}
+        self.load_seconds = {}
+        self.memory_mb = {}
+        self.switches = []           # (from, to, seconds until the new recognizer was ready)
+        self._models = {}
+        self._locks = {lang: threading.Lock() for lang in self.paths}
+
+    @property
+    def languages(self):
+        return list(self.paths)
+
+    def loaded(self, lang):
+        return lang in self._models
+
+    def get(self, lang):
+        """The model for a language, loading it if this is the first use"""
+        if lang not in self.paths:
+            raise KeyError(f"No Vosk model configured for '{lang}'")
+        model = self._models.get(lang)
+        if model is not None:
+            return model
+        with self._locks[lang]:
+            if lang not in self._models:
+                from vosk import Model
+                before = resident_mb()
+                start = time.perf_counter()
+                with tracing.span("model_load", lang=lang, path=self.paths[lang]):
+                    self._models[lang] = Model(self.paths[lang])
+                self.load_seconds[lang] = time.perf_counter() - start
+                after = resident_mb()
+                if before is not None and after is not None:
+                    self.memory_mb[lang] = after - before
+                    tracing.set_gauge("model_memory_mb", round(after - before, 1), lang=lang)
+                memory = f", +{self.memory_mb[lang]:.0f} MB resident" if lang in self.memory_mb else ""
+                print(f"🧠 Loaded {lang} model in {self.load_seconds[lang]:.1f} s{memory}")
+        return self._models[lang]
+
+    def recognizer(self, lang, rate, words=False):
+        from vosk import KaldiRecognizer
+        rec = KaldiRecognizer(self.get(lang), rate)
+        if words:
+            rec.SetWords(True)
+        return rec
+
+    def switch(self, old, new, rate, replay=()):
+        """A recognizer for `new` with `replay` chunks already fed to it.
+
+        Returns (recognizer, seconds, text), text being what was recognized in
+        the replay. When the language changes the time to get there - including
+        a lazy model load - is recorded as switch latency.
+        """
+        start = time.perf_counter()
+        rec = self.recognizer(new, rate)
+        heard = []
+        for data in replay:
+            if rec.AcceptWaveform(data):
+                heard.append(json.loads(rec.Result()).get("text", "").strip())
+        seconds = time.perf_counter() - start
+        if old != new:
+            self.switches.append((old, new, seconds))
+            tracing.observe("language_switch", seconds)
+            tracing.inc("language_switches", to=new)
+        return rec, seconds, " ".join(t for t in heard if t)
+
+    def preload(self, langs=None):
+        """Load models on a background thread; returns the thread"""
+        def load():
+            for lang in langs or self.languages:
+                try:
+                    self.get(lang)
+                except Exception as e:
+                    print(f"❌ Failed to load {lang} model: {e}")
+        thread = threading.Thread(target=load, daemon=True, name="atlas-model-preload")
+        thread.start()
+        return thread
+
+    def summary(self):
+        parts = []
+        for lang in self.languages:
+            if lang not in self._models:
+                parts.append(f"{lang}: not loaded")
+                continue
+            memory = f", {self.memory_mb[lang]:.0f} MB" if lang in self.memory_mb else ""
+            parts.append(f"{lang}: loaded in {self.load_seconds[lang]:.1f} s{memory}")
+        if self.switches:
+            ms = sorted(s * 1000 for _, _, s in self.switches)
+            parts.append(f"{len(ms)} switch(es), median {ms[len(ms) // 2]:.0f} ms")
+        return "; ".join(parts)
+
+
+def _rms(data):
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float64)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+class LanguageProbe:
+    """Picks the spoken language of an utterance.
+
+    Every chunk is fed to one recognizer per language until PROBE_SECONDS of
+    speech (chunks above the silence threshold) have been heard; the language
+    whose recognizer is most confident in its words wins. The current
+    language is kept unless another one is clearly more confident.
+    """
+
+    def __init__(self, registry, langs, rate, current, silence_threshold=500):
+        self.rate = rate
+        self.current = current
+        self.silence_threshold = silence_threshold
+        self.recognizers = {lang: registry.recognizer(lang, rate, words=True) for lang in langs}
+        self.speech_seconds = 0.0
+        self.heard = []           # text any language recognized in the last chunk fed
+        self.scores = {}
+        self._words = {lang: [] for lang in langs}
+
+    def feed(self, data):
+        """Feed one chunk; returns the chosen language once enough speech was heard, else None"""
+        self.heard = []
+        for lang, rec in self.recognizers.items():
+            if rec.AcceptWaveform(data):
+                result = json.loads(rec.Result())
+                self._words[lang] += result.get("result", [])
+                if result.get("text"):
+                    self.heard.append(result["text"])
+        if _rms(data) >= self.silence_threshold:
+            self.speech_seconds += len(data) / (2 * self.rate)
+        if self.speech_seconds >= PROBE_SECONDS:
+            return self.decide()
+        return None
+
+    def decide(self):
+        """Choose now with whatever audio was fed"""
+        for lang, rec in self.recognizers.items():
+            words = self._words[lang] + json.loads(rec.FinalResult()).get("result", [])
+            confs = [w.get("conf", 0.0) for w in words]
+            self.scores[lang] = sum(confs) / len(confs) if confs else 0.0
+
+        best = max(self.scores, key=self.scores.get)
+        if self.current in self.scores and self.scores[best] - self.scores[self.current] < PROBE_MIN_MARGIN:
+            best = self.current
+        return best